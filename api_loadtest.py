@@ -0,0 +1,147 @@
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+# ---------------------- Configuration -----------------------
+DEFAULT_URL = "http://127.0.0.1:8765"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 10.0
+
+# Share of requests sent as conditional GETs with an ETag seen earlier
+CONDITIONAL_SHARE = 0.5
+
+PROJECTION = "username,phone_number,address"
+
+
+# ---------------------- Workload -----------------------
+def _get_json(base_url, path):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        return json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def build_paths(base_url, page_size=50):
+    """
+    Request paths covering the served outputs: the first page of every state / city /
+    provider group, the same with a field projection, a second page where there is one, and
+    per-state listings
+    """
+    outputs = _get_json(base_url, '/outputs')['outputs']
+    paths = []
+    for output in outputs:
+        filters = {'state': output['state'], 'city': output['city'], 'provider_type': output['provider_type']}
+        paths.append(f"/listings?{urlencode({**filters, 'limit': page_size})}")
+        paths.append(f"/listings?{urlencode({**filters, 'limit': page_size, 'fields': PROJECTION})}")
+        if output['rows'] > page_size:
+            first = _get_json(base_url, paths[-2])
+            paths.append(f"/listings?{urlencode({**filters, 'limit': page_size, 'cursor': first['next_cursor']})}")
+    for state in sorted({output['state'] for output in outputs}):
+        paths.append(f"/listings?{urlencode({'state': state, 'limit': page_size})}")
+    return paths
+
+
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(share * len(sorted_values)), len(sorted_values) - 1)]
+
+
+# ---------------------- Load Test -----------------------
+def run_load_test(base_url=DEFAULT_URL, concurrency=DEFAULT_CONCURRENCY, duration=DEFAULT_DURATION,
+                  conditional_share=CONDITIONAL_SHARE, seed=0):
+    """
+    Hammer the results API from concurrency keep-alive connections for duration seconds
+    Returns a summary dict with requests/sec, latency percentiles (ms) and status counts
+    """
+    paths = build_paths(base_url)
+    if not paths:
+        raise RuntimeError(f"{base_url} serves no outputs to query")
+    parts = urlsplit(base_url)
+    etags = {}
+    latencies = []
+    statuses = {}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local_latencies = []
+        local_statuses = {}
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            headers = {}
+            etag = etags.get(path)
+            if etag and rng.random() < conditional_share:
+                headers['If-None-Match'] = etag
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                with lock:
+                    errors.append(str(e))
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[response.status] = local_statuses.get(response.status, 0) + 1
+            if response.status == 200 and response.getheader('ETag'):
+                etags[path] = response.getheader('ETag')
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(seed + i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'paths': len(paths),
+        'elapsed': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'statuses': dict(sorted(statuses.items())),
+        'errors': len(errors),
+    }
+
+
+def print_report(result, concurrency):
+    print(f"{result['requests']} requests over {result['paths']} paths in {result['elapsed']:.1f}s "
+          f"with {concurrency} connections")
+    print(f"  Throughput: {result['rps']:.0f} requests/sec")
+    print(f"  Latency: p50 {result['p50_ms']:.2f} ms, p90 {result['p90_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms")
+    print(f"  Status codes: {', '.join(f'{status}: {count}' for status, count in result['statuses'].items())}"
+          + (f", connection errors: {result['errors']}" if result['errors'] else ""))
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    # Same as `python -m cli bench api`
+    import sys
+    from cli import main
+
+    main(['bench', 'api'] + sys.argv[1:])
@@ -1,10 +1,16 @@
 import streamlit as st
 import os
-import pandas as pd
-from main import scrape_yellow_pages
-from scrape_urls import scrape_url, read_urls_from_csv, get_session
+from file_cache import load_csv, load_download_payload
+from manifest import list_state_folders, load_manifest
+from exports import build_bundle_file, matches_provider
+from results_query import ResultsQuery, DUCKDB_AVAILABLE
+from records import serialize_file, PARQUET_AVAILABLE
+from providers import PROVIDER_TYPES
 import time
 
+# The scrapers (requests, bs4, cloudscraper) and the spatial index (NumPy/pandas) are imported
+# inside the pages that use them, so a rerun of any other page doesn't pay for them
+
 # Page configuration
 st.set_page_config(
     page_title="YellowPages Scraper",
@@ -64,17 +70,135 @@ US_STATES = {
     "Virginia": "VA", "Washington": "WA", "West Virginia": "WV", "Wisconsin": "WI", "Wyoming": "WY"
 }
 
-# Provider types mapping (key: filename format, value: search term)
-PROVIDER_TYPES = {
-    'diagnostic-center': 'medical diagnostic center',
-    'imaging-labs': 'medical imaging labs',
-    'primary-care': 'primary care',
-    'dental-care': 'dental care',
-    'urgent-care': 'urgent care',   
-    'vision-care': 'medical vision care',
-    'chiropractics': 'chiropractics',
-    'physiotherapy': 'physiotherapy'
-}
+
+def render_result_file(folder_path, file_name, entry, row_label, download_key_prefix):
+    """
+    Render one result file as an expander
+    The title comes from the state manifest; the CSV itself is only read once the
+    user asks for its contents, through the mtime-keyed cache
+    """
+    filepath = os.path.join(folder_path, file_name)
+    try:
+        with st.expander(f"📄 {file_name} ({entry['rows']} {row_label})"):
+            if not st.toggle("Load contents", key=f"load_{filepath}"):
+                st.caption(f"{entry['size'] / 1024:.1f} KB · columns: {', '.join(entry['columns'])}")
+                return
+            df = load_csv(filepath)
+            st.dataframe(df, use_container_width=True)
+            
+            # Download button (data files can also be converted to JSONL / Parquet)
+            if download_key_prefix:
+                fmt = "CSV"
+                if entry['kind'] == 'data':
+                    formats = ["CSV", "JSONL"] + (["Parquet"] if PARQUET_AVAILABLE else [])
+                    fmt = st.radio("Format", formats, horizontal=True, key=f"format_{filepath}")
+                if fmt == "CSV":
+                    payload, download_name, mime = load_download_payload(filepath), file_name, "text/csv"
+                elif fmt == "JSONL":
+                    payload = serialize_file(filepath, 'jsonl')
+                    download_name, mime = file_name[:-len(".csv")] + ".jsonl", "application/x-ndjson"
+                else:
+                    payload = serialize_file(filepath, 'parquet')
+                    download_name, mime = file_name[:-len(".csv")] + ".parquet", "application/octet-stream"
+                st.download_button(
+                    label=f"Download {download_name}",
+                    data=payload,
+                    file_name=download_name,
+                    mime=mime,
+                    key=f"{download_key_prefix}_{file_name}"
+                )
+    except Exception as e:
+        st.error(f"Error reading {file_name}: {e}")
+
+
+@st.cache_resource
+def get_results_query():
+    return ResultsQuery()
+
+
+def render_query_view(state_folders):
+    """Filter, paginate and aggregate scraped listings across every state via DuckDB"""
+    query = get_results_query()
+    query.refresh()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        state = st.selectbox("State", options=[None] + state_folders,
+                             format_func=lambda x: "All states" if x is None else x)
+    with col2:
+        cities = query.distinct("City", state=state) if state else []
+        city = st.selectbox("City", options=[None] + cities,
+                            format_func=lambda x: "All cities" if x is None else x)
+    with col3:
+        provider_type = st.selectbox("Provider Type", options=[None] + list(PROVIDER_TYPES.keys()),
+                                     format_func=lambda x: "All providers" if x is None else PROVIDER_TYPES[x].title())
+    with col4:
+        name_contains = st.text_input("Name contains", value="")
+    
+    filters = dict(state=state, city=city, provider_type=provider_type, name_contains=name_contains or None)
+    total = query.count(**filters)
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("Rows per page", options=[25, 50, 100, 500], index=1)
+    page_count = max((total + page_size - 1) // page_size, 1)
+    with col2:
+        page_num = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+    
+    st.info(f"{total} matching listings")
+    st.dataframe(query.page(page_num, page_size, **filters), use_container_width=True)
+    
+    with st.expander("📈 Counts by state and provider type"):
+        st.dataframe(query.aggregate(("State", "Provider Type"), **filters), use_container_width=True)
+    if state:
+        with st.expander(f"🏙️ Counts by city in {state}"):
+            st.dataframe(query.aggregate(("City", "Provider Type"), **filters), use_container_width=True)
+
+
+@st.cache_resource
+def get_spatial_index():
+    from spatial_index import SpatialIndex
+    return SpatialIndex()
+
+
+def render_nearby_view():
+    """Radius / bounding-box search over the coordinates of every scraped listing"""
+    index = get_spatial_index()
+    index.refresh()
+    
+    mode = st.radio("Search", ["Within a radius", "Inside a bounding box"], horizontal=True)
+    provider_type = st.selectbox("Provider Type", options=[None] + list(PROVIDER_TYPES.keys()),
+                                 format_func=lambda x: "All providers" if x is None else PROVIDER_TYPES[x].title(),
+                                 key="nearby_provider")
+    
+    start = time.perf_counter()
+    if mode == "Within a radius":
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            lat = st.number_input("Latitude", min_value=-90.0, max_value=90.0, value=47.6062, format="%.4f")
+        with col2:
+            lon = st.number_input("Longitude", min_value=-180.0, max_value=180.0, value=-122.3321, format="%.4f")
+        with col3:
+            miles = st.slider("Radius (miles)", min_value=1, max_value=100, value=10)
+        results = index.radius(lat, lon, miles, provider_type)
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            min_lat = st.number_input("Min latitude", min_value=-90.0, max_value=90.0, value=47.0, format="%.4f")
+        with col2:
+            max_lat = st.number_input("Max latitude", min_value=-90.0, max_value=90.0, value=48.0, format="%.4f")
+        with col3:
+            min_lon = st.number_input("Min longitude", min_value=-180.0, max_value=180.0, value=-123.0, format="%.4f")
+        with col4:
+            max_lon = st.number_input("Max longitude", min_value=-180.0, max_value=180.0, value=-122.0, format="%.4f")
+        results = index.bbox(min_lat, min_lon, max_lat, max_lon, provider_type)
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    st.info(f"{len(results)} listings found among {len(index)} with coordinates ({elapsed:.1f} ms)")
+    if len(results):
+        st.map(results.rename(columns={'Latitude': 'latitude', 'Longitude': 'longitude'}).head(5000))
+        st.dataframe(results, use_container_width=True)
+
 
 # URL Collection Page
 if page == "URL Collection":
@@ -134,6 +258,8 @@ if page == "URL Collection":
                 sys.stdout = captured_output = StringIO()
                 
                 try:
+                    from main import scrape_yellow_pages
+                    
                     # Run the scraping function
                     scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=use_cloudscraper)
                     
@@ -154,7 +280,7 @@ if page == "URL Collection":
                         
                         # Show preview of collected URLs
                         try:
-                            df = pd.read_csv(filepath)
+                            df = load_csv(filepath)
                             st.subheader("📊 Collected URLs Preview")
                             st.dataframe(df, use_container_width=True)
                             st.info(f"Total URLs collected: {len(df)}")
@@ -215,7 +341,7 @@ elif page == "Data Scraping":
     
     if os.path.exists(filepath):
         try:
-            df_urls = pd.read_csv(filepath)
+            df_urls = load_csv(filepath)
             st.success(f"✅ Found {len(df_urls)} URLs to scrape from: {filepath}")
             st.dataframe(df_urls.head(10), use_container_width=True)
             if len(df_urls) > 10:
@@ -246,21 +372,18 @@ elif page == "Data Scraping":
                 sys.stdout = captured_output = StringIO()
                 
                 try:
+                    from scrape_urls import scrape_url, read_urls_from_csv
+                    from transport import get_shared_session, establish_session
+                    
                     # Read URLs (use provider_type_key for filename matching)
                     urls = read_urls_from_csv(state, city_name, provider_type_key)
                     
                     if urls:
-                        # Initialize session
-                        session = get_session(use_cloudscraper=use_cloudscraper)
+                        # Reuse the session (and its pooled connections) from URL collection
+                        session = get_shared_session(use_cloudscraper=use_cloudscraper)
                         
-                        # Establish session
-                        try:
-                            timeout = 60 if use_cloudscraper else 30
-                            response = session.get('https://www.yellowpages.com', timeout=timeout, allow_redirects=True)
-                            if response.status_code == 200:
-                                st.info("✓ Session established")
-                        except Exception as e:
-                            st.warning(f"Could not load homepage: {e}")
+                        # Establish session (skipped if URL collection already did)
+                        establish_session(session, use_cloudscraper=use_cloudscraper)
                         
                         # Run scraping (use provider_type_key for the key parameter)
                         scrape_url(urls, session, provider_type_key, state, city_name, use_cloudscraper=use_cloudscraper)
@@ -282,7 +405,7 @@ elif page == "Data Scraping":
                             
                             # Show preview
                             try:
-                                df = pd.read_csv(data_filepath)
+                                df = load_csv(data_filepath)
                                 st.subheader("📊 Scraped Data Preview")
                                 st.dataframe(df, use_container_width=True)
                                 st.info(f"Total records scraped: {len(df)}")
@@ -306,82 +429,103 @@ elif page == "View Results":
     st.markdown("View and download collected URLs and scraped data.")
     
     # Get all state folders
-    state_folders = [f for f in os.listdir('.') if os.path.isdir(f) and len(f) == 2 and f.isupper()]
+    state_folders = list_state_folders()
+    
+    view_modes = ["Browse files"] + (["Query all results"] if DUCKDB_AVAILABLE else []) + ["Search nearby"]
+    view_mode = st.radio("View", view_modes, horizontal=True)
     
     if not state_folders:
         st.info("No results found. Please run URL Collection or Data Scraping first.")
+    elif view_mode == "Query all results":
+        render_query_view(state_folders)
+    elif view_mode == "Search nearby":
+        render_nearby_view()
     else:
         selected_state = st.selectbox("Select State", options=state_folders)
         
         if selected_state:
             folder_path = selected_state
-            csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
+            files = load_manifest(folder_path)
             
-            if not csv_files:
+            if not files:
                 st.info(f"No CSV files found in {selected_state} folder.")
             else:
                 st.subheader(f"Files in {selected_state} folder")
                 
                 # Separate URL files and data files
-                url_files = [f for f in csv_files if '_urls.csv' in f]
-                data_files = [f for f in csv_files if '_urls.csv' not in f and '_failed.csv' not in f]
-                failed_files = [f for f in csv_files if '_failed.csv' in f]
+                url_files = sorted(f for f, entry in files.items() if entry['kind'] == 'urls')
+                data_files = sorted(f for f, entry in files.items() if entry['kind'] == 'data')
+                failed_files = sorted(f for f, entry in files.items() if entry['kind'] == 'failed')
+                retry_files = sorted(f for f, entry in files.items() if entry['kind'] == 'retry')
+                dead_files = sorted(f for f, entry in files.items() if entry['kind'] == 'dead')
+                needs_selector_files = sorted(f for f, entry in files.items() if entry['kind'] == 'needs_selector')
+                delta_files = sorted(f for f, entry in files.items() if entry['kind'] == 'delta')
                 
                 # URL Files
                 if url_files:
                     st.markdown("### 🔗 URL Collection Files")
                     for url_file in url_files:
-                        filepath = os.path.join(folder_path, url_file)
-                        try:
-                            df = pd.read_csv(filepath)
-                            with st.expander(f"📄 {url_file} ({len(df)} URLs)"):
-                                st.dataframe(df, use_container_width=True)
-                                
-                                # Download button
-                                csv_data = df.to_csv(index=False)
-                                st.download_button(
-                                    label=f"Download {url_file}",
-                                    data=csv_data,
-                                    file_name=url_file,
-                                    mime="text/csv",
-                                    key=f"download_url_{url_file}"
-                                )
-                        except Exception as e:
-                            st.error(f"Error reading {url_file}: {e}")
+                        render_result_file(folder_path, url_file, files[url_file], "URLs", "download_url")
                 
                 # Data Files
                 if data_files:
                     st.markdown("### 📋 Scraped Data Files")
                     for data_file in data_files:
-                        filepath = os.path.join(folder_path, data_file)
-                        try:
-                            df = pd.read_csv(filepath)
-                            with st.expander(f"📄 {data_file} ({len(df)} records)"):
-                                st.dataframe(df, use_container_width=True)
-                                
-                                # Download button
-                                csv_data = df.to_csv(index=False)
-                                st.download_button(
-                                    label=f"Download {data_file}",
-                                    data=csv_data,
-                                    file_name=data_file,
-                                    mime="text/csv",
-                                    key=f"download_data_{data_file}"
-                                )
-                        except Exception as e:
-                            st.error(f"Error reading {data_file}: {e}")
+                        render_result_file(folder_path, data_file, files[data_file], "records", "download_data")
                 
                 # Failed Files
                 if failed_files:
                     st.markdown("### ❌ Failed URLs Files")
                     for failed_file in failed_files:
-                        filepath = os.path.join(folder_path, failed_file)
-                        try:
-                            df = pd.read_csv(filepath)
-                            with st.expander(f"📄 {failed_file} ({len(df)} failed URLs)"):
-                                st.dataframe(df, use_container_width=True)
-                        except Exception as e:
-                            st.error(f"Error reading {failed_file}: {e}")
+                        render_result_file(folder_path, failed_file, files[failed_file], "failed URLs", None)
+                
+                # Retry queue (URLs cut short by the circuit breaker)
+                if retry_files:
+                    st.markdown("### 🔁 Retry Queue Files")
+                    for retry_file in retry_files:
+                        render_result_file(folder_path, retry_file, files[retry_file], "queued URLs", None)
+                
+                # Dead-letter files (URLs that ran out of retry attempts)
+                if dead_files:
+                    st.markdown("### ⛔ Dead-Letter Files")
+                    for dead_file in dead_files:
+                        render_result_file(folder_path, dead_file, files[dead_file], "dead-lettered URLs", None)
+                
+                # Pages no selector matched (HTML kept in the _needs_selector folder)
+                if needs_selector_files:
+                    st.markdown("### 🧩 Needs New Selector Files")
+                    for needs_selector_file in needs_selector_files:
+                        render_result_file(folder_path, needs_selector_file, files[needs_selector_file],
+                                           "unparsed pages", None)
+                
+                # Delta files (added/changed/removed listings of the last run)
+                if delta_files:
+                    st.markdown("### 🔀 Change Delta Files")
+                    for delta_file in delta_files:
+                        render_result_file(folder_path, delta_file, files[delta_file], "changes", "download_delta")
+                
+                # Bundle export
+                st.markdown("### 📦 Export")
+                export_providers = [p for p in PROVIDER_TYPES if any(matches_provider(f, p) for f in files)]
+                export_provider = st.selectbox(
+                    "Files to include",
+                    options=[None] + export_providers,
+                    format_func=lambda x: f"All files in {selected_state}" if x is None else PROVIDER_TYPES[x].title(),
+                    key=f"export_provider_{selected_state}"
+                )
+                if st.button("Prepare zip bundle", key=f"export_build_{selected_state}"):
+                    with st.spinner("Compressing files..."):
+                        st.session_state[f"bundle_{selected_state}"] = build_bundle_file(folder_path, export_provider)
+                bundle_path = st.session_state.get(f"bundle_{selected_state}")
+                if bundle_path and os.path.exists(bundle_path):
+                    with open(bundle_path, mode='rb') as bundle_file:
+                        st.download_button(
+                            label=f"Download {os.path.basename(bundle_path)} ({os.path.getsize(bundle_path) / 1024:.1f} KB)",
+                            data=bundle_file,
+                            file_name=os.path.basename(bundle_path),
+                            mime="application/zip",
+                            key=f"download_bundle_{selected_state}"
+                        )
 
 # Footer
 st.markdown("---")
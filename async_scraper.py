@@ -0,0 +1,518 @@
+import asyncio
+import importlib.util
+import os
+import time
+import weakref
+from contextlib import aclosing, asynccontextmanager
+from urllib.parse import urlsplit
+
+from circuit_breaker import get_breaker, get_latency_tracker
+from change_detection import SnapshotDiff
+from clock import get_clock
+from listing_index import get_listing_index, INDEX_MAX_AGE
+from main import (
+    MAX_PAGES, urls_output_path, urls_to_csv, load_progress, save_progress, search_page_url,
+    find_result_cards, extract_result_urls, has_next_page
+)
+from metrics import get_metrics
+from page_archive import archive_response
+from page_classifier import classify_response, INTERSTITIAL, NON_CONTENT_LABELS
+from records import ListingRecord, FailedUrl
+from scrape_urls import (
+    DetailFieldScanner, ExtractionError, output_path, parse_listing, save_listing, save_needs_selector_page,
+    finish_scrape, pending_needs_selector, resolve_needs_selector, to_csv
+)
+from transport import (
+    BASE_URL, BROWSER_HEADERS, MAX_PAGE_BYTES, POOL_MAXSIZE, STREAM_CHUNK_SIZE, StreamedResponse,
+    default_timeout, get_random_proxy, is_backend_failure, record_streamed
+)
+from url_sources import canonical_url, iter_csv_urls
+
+# aiohttp is only looked up here; AsyncScraper imports it when a session is opened
+AIOHTTP_AVAILABLE = importlib.util.find_spec('aiohttp') is not None
+# aiohttp decodes br only with one of these installed
+BROTLI_AVAILABLE = any(importlib.util.find_spec(name) is not None for name in ('brotli', 'brotlicffi'))
+
+
+# ---------------------- Configuration -----------------------
+# Items buffered by merge_streams before every job pauses
+MERGE_BUFFER = 100
+
+# Random gap (seconds) between two requests to the same host, as in the sync scrapers
+SEARCH_PACE = (3, 6)
+DETAIL_PACE = (3, 8)
+
+MAX_RETRIES = 3
+
+
+# ---------------------- Pacing -----------------------
+class HostPacer:
+    """
+    Per-host request pacing shared by every job on an event loop
+    Requests to one host go one at a time, each starting a random gap after the previous one
+    finished, so the site sees the sync scrapers' request rate however many jobs run.
+    Gaps are drawn and timed on the scraper clock, so a VirtualClock drives them too.
+    """
+
+    def __init__(self):
+        self.locks = {}
+        self.last_done = {}
+
+    @asynccontextmanager
+    async def slot(self, url, min_sec, max_sec):
+        host = urlsplit(url).hostname
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        clock = get_clock()
+        async with lock:
+            last = self.last_done.get(host)
+            if last is not None:
+                delay = last + clock.uniform(min_sec, max_sec) - clock.now()
+                if delay > 0:
+                    print(f"Waiting {delay:.2f} seconds before next request to {host}...")
+                    await clock.sleep_async(delay)
+            try:
+                yield
+            finally:
+                self.last_done[host] = clock.now()
+
+
+_pacers = weakref.WeakKeyDictionary()
+
+
+def get_host_pacer():
+    """Pacer of the running event loop"""
+    loop = asyncio.get_running_loop()
+    if loop not in _pacers:
+        _pacers[loop] = HostPacer()
+    return _pacers[loop]
+
+
+def _known_urls(filepath):
+    return {canonical_url(url) for url in iter_csv_urls(filepath)} if os.path.isfile(filepath) else set()
+
+
+def _write_if_changed(diff, url, listing_url, row):
+    """Reused index entry: append it to the data CSV unless the snapshot already has it"""
+    if diff.check(url, listing_url, row):
+        to_csv([row])
+
+
+# ---------------------- Streams -----------------------
+class _StreamFailed:
+    def __init__(self, error):
+        self.error = error
+
+
+async def _aiter(items):
+    """Async iterator over a sync or async iterable; closes an async source when it is closed"""
+    if hasattr(items, '__aiter__'):
+        try:
+            async for item in items:
+                yield item
+        finally:
+            if hasattr(items, 'aclose'):
+                await items.aclose()
+    else:
+        for item in items:
+            yield item
+
+
+async def merge_streams(*streams, buffer=MERGE_BUFFER):
+    """
+    Interleave several async iterators (e.g. jobs for different states) into one
+    Each stream is pumped by its own task into a queue of at most `buffer` items, so a slow
+    consumer pauses every job instead of letting results pile up. Leaving the loop early or
+    cancelling the consumer cancels all jobs; a job's exception cancels the others and is re-raised.
+    """
+    queue = asyncio.Queue(maxsize=buffer)
+    finished = object()
+
+    async def pump(stream):
+        try:
+            async for item in stream:
+                await queue.put(item)
+        except Exception as e:
+            await queue.put(_StreamFailed(e))
+            return
+        finally:
+            if hasattr(stream, 'aclose'):
+                await stream.aclose()
+        await queue.put(finished)
+
+    tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is finished:
+                remaining -= 1
+            elif isinstance(item, _StreamFailed):
+                raise item.error
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ---------------------- Scraper -----------------------
+class AsyncScraper:
+    """
+    asyncio counterpart of main.scrape_yellow_pages and scrape_urls.scrape_url
+    One aiohttp session is shared by any number of concurrent jobs. Pages go through the
+    same extraction functions, page archive, listing index and CSV writers as the sync path,
+    and records are streamed out as async iterators: nothing is fetched ahead of the consumer,
+    and cancelling a job stops it between requests with its URL progress already on disk.
+    There is no cloudscraper equivalent, so challenge pages are only waited out and retried.
+
+        async with AsyncScraper() as scraper:
+            async for record in scraper.job("dental care", "WA", "Aberdeen"):
+                ...
+    """
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self.session = None
+        self.homepage_visited = False
+        self.homepage_lock = None
+
+    async def __aenter__(self):
+        import aiohttp
+
+        headers = {name: value for name, value in BROWSER_HEADERS.items() if name != 'Connection'}
+        headers['Accept-Encoding'] = 'gzip, deflate' + (', br' if BROTLI_AVAILABLE else '')
+        self.session = aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=self.pool_maxsize),
+            proxy=get_random_proxy(),
+        )
+        self.homepage_lock = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def fetch(self, url, scanner=None, timeout=None, max_bytes=MAX_PAGE_BYTES):
+        """
+        GET url reading the body in chunks, like transport.fetch_streaming
+        Waits out an open circuit breaker (or its probe) without blocking the loop. Raises asyncio.TimeoutError
+        or aiohttp.ClientError on failure.
+        """
+        import aiohttp
+
+        breaker = get_breaker()
+        await breaker.before_request_async()
+
+        timeout = timeout or default_timeout(use_cloudscraper=False)
+        start = time.monotonic()
+        content = bytearray()
+        truncated = False
+        size_capped = False
+        recorded = False
+        try:
+            async with self.session.get(
+                url, timeout=aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+            ) as response:
+                failed = is_backend_failure(response.status)
+                breaker.record(not failed)
+                recorded = True
+                if not failed:
+                    get_latency_tracker().record(time.monotonic() - start)
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    content += chunk
+                    if scanner is not None and response.status < 400 and scanner.feed(chunk):
+                        truncated = True
+                        break
+                    if len(content) >= max_bytes:
+                        truncated = size_capped = True
+                        break
+                if truncated:
+                    # Don't hand a half-read connection back to the pool
+                    response.close()
+                wire = getattr(response.content, 'total_raw_bytes', None) or len(content)
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            if not recorded:
+                breaker.record(False)
+            raise
+
+        record_streamed(response.status, response.headers, wire, len(content), truncated, size_capped,
+                        time.monotonic() - start)
+        return StreamedResponse(response.status, response.headers, response.url, response.charset,
+                                content, truncated, size_capped)
+
+    async def fetch_page(self, url, pace, scanner=None):
+        """Paced fetch, labelled and archived like the sync scrapers do; returns (response, label)"""
+        timeout = get_latency_tracker().timeout(default_timeout(use_cloudscraper=False))
+        async with get_host_pacer().slot(url, *pace):
+            response = await self.fetch(url, scanner=scanner, timeout=timeout)
+        page_label = classify_response(response)
+        await asyncio.to_thread(archive_response, url, response, page_label)
+        return response, page_label
+
+    async def establish(self):
+        """Visit the homepage once per session, however many jobs start at the same time"""
+        async with self.homepage_lock:
+            if self.homepage_visited:
+                return
+            print("Establishing session by visiting homepage...")
+            try:
+                async with get_host_pacer().slot(BASE_URL, *SEARCH_PACE):
+                    response = await self.fetch(BASE_URL)
+                print(f"Homepage response status: {response.status_code}")
+                if response.status_code == 200:
+                    print("✓ Homepage loaded successfully")
+                else:
+                    print(f"Warning: Homepage returned status {response.status_code}")
+            except Exception as e:
+                print(f"Warning: Could not load homepage: {e}")
+                print("Continuing anyway...")
+            self.homepage_visited = True
+
+    async def collect_urls(self, search_term, state, city_name, resume=True):
+        """
+        Async counterpart of main.scrape_yellow_pages
+        Yields every business URL found in this run, page by page. New URLs are appended to
+        the URL CSV and the resume point saved after each page, before the page's URLs are
+        yielded, so a cancelled collection resumes where it stopped.
+        """
+        import aiohttp
+        from bs4 import BeautifulSoup
+
+        await self.establish()
+        provider_type = search_term.replace(" ", "_").lower()
+        filepath = urls_output_path(state, city_name, provider_type)
+        known_urls = await asyncio.to_thread(_known_urls, filepath)
+
+        run_urls = set()
+        new_count = 0
+        page_num = 1
+        last_completed = await asyncio.to_thread(load_progress, search_term, state, city_name) if resume else 0
+        if last_completed:
+            page_num = last_completed + 1
+            print(f"[{city_name}, {state}] Resuming after page {last_completed}")
+        finished = False
+        consecutive_failures = 0
+        max_failures = 3
+        pace = SEARCH_PACE
+
+        while page_num <= MAX_PAGES:
+            search_url = search_page_url(search_term, state, city_name, page_num)
+            print(f"[{city_name}, {state}] Collecting URLs from page {page_num}: {search_url}")
+            try:
+                response, page_label = await self.fetch_page(search_url, pace)
+                if page_label == INTERSTITIAL or response.status_code == 403:
+                    print(f"[{city_name}, {state}] Got {response.status_code} ({page_label}), retrying after a delay")
+                    response, page_label = await self.fetch_page(search_url, (10, 15))
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                print(f"[{city_name}, {state}] Error loading search page {page_num}: {e!r}")
+                response, page_label = None, None
+
+            page_urls = []
+            soup = None
+            if response is None or response.status_code >= 400 or page_label in NON_CONTENT_LABELS:
+                if response is not None:
+                    print(f"[{city_name}, {state}] Got {response.status_code} / {page_label} page instead of search results")
+                pace = (5, 8)
+            else:
+                soup = await asyncio.to_thread(BeautifulSoup, response.content, 'html.parser')
+                result_cards = find_result_cards(soup)
+                if not result_cards:
+                    print(f"[{city_name}, {state}] No result cards found with any selector")
+                    pace = (3, 5)
+                else:
+                    page_urls = extract_result_urls(result_cards)
+                    pace = SEARCH_PACE
+
+            if soup is None or not page_urls:
+                consecutive_failures += 1
+                if consecutive_failures >= max_failures:
+                    print(f"[{city_name}, {state}] Too many failed or empty pages, stopping")
+                    break
+                page_num += 1
+                continue
+
+            new_urls = await asyncio.to_thread(urls_to_csv, page_urls, state, city_name, provider_type,
+                                               known=known_urls)
+            new_count += len(new_urls)
+            page_keys = {canonical_url(url) for url in page_urls} - run_urls
+            run_urls |= page_keys
+            print(f"[{city_name}, {state}] Collected {len(page_keys)} URLs from page {page_num} "
+                  f"({len(new_urls)} new). Total: {len(run_urls)}")
+            if page_num == last_completed + 1:
+                last_completed = page_num
+                await asyncio.to_thread(save_progress, search_term, state, city_name, last_completed)
+            consecutive_failures = consecutive_failures + 1 if not page_keys else 0
+
+            # Only URLs first seen on this page, after the page is on disk
+            for url in page_urls:
+                url_key = canonical_url(url)
+                if url_key in page_keys:
+                    page_keys.discard(url_key)
+                    yield url
+
+            if consecutive_failures >= max_failures:
+                print(f"[{city_name}, {state}] No new URLs found for multiple pages, stopping")
+                break
+            if not has_next_page(soup):
+                print(f"[{city_name}, {state}] Reached last page - no next button available")
+                finished = True
+                break
+            page_num += 1
+        else:
+            finished = True
+
+        if finished:
+            await asyncio.to_thread(save_progress, search_term, state, city_name, None)
+        elif last_completed:
+            print(f"[{city_name}, {state}] Collection stopped early; the next run resumes after page {last_completed}")
+        print(f"[{city_name}, {state}] Total URLs collected: {len(run_urls)}, new: {new_count} (written to {filepath})")
+
+    async def scrape_listings(self, urls, key, state, city_name, prior_attempts=None, write_failures=True,
+                              use_listing_index=True, full_run=True):
+        """
+        Async counterpart of scrape_urls.scrape_url, yielding a ListingRecord per scraped URL
+        urls can be a sync or async iterable (e.g. collect_urls, to scrape while collecting).
+        Records are written to the data CSV as by scrape_url; failed / retry URLs, the
+        needs-selector bucket and the delta file are written when the iteration ends. A job
+        that is cancelled or left early writes its failures but never reports removed listings.
+        All index and file writes run in worker threads to keep the loop free.
+        """
+        await self.establish()
+        prior_attempts = prior_attempts or {}
+        listing_index = get_listing_index() if use_listing_index else None
+        diff = await asyncio.to_thread(SnapshotDiff, listing_index, output_path(state, city_name, key),
+                                       state, city_name, key) if listing_index else None
+        breaker = get_breaker()
+        needs_selector_pending = await asyncio.to_thread(pending_needs_selector, state, city_name, key)
+        failures = {'failed': [], 'retry': [], 'needs_selector': []}
+        completed = False
+
+        try:
+            async with aclosing(_aiter(urls)) as url_stream:
+                async for url in url_stream:
+                    cached = await asyncio.to_thread(listing_index.lookup, url, max_age=INDEX_MAX_AGE,
+                                                     output=(state, city_name, key)) if listing_index else None
+                    if cached:
+                        listing_url, business_data = cached
+                        print(f"  ↺ Reusing indexed listing: {business_data.username}")
+                        row = ListingRecord.from_business(business_data, key, state, city_name)
+                        await asyncio.to_thread(_write_if_changed, diff, url, listing_url, row)
+                        await asyncio.to_thread(resolve_needs_selector, url, needs_selector_pending,
+                                                state, city_name, key)
+                        yield row
+                        continue
+
+                    row, failure, bucket = await self._scrape_one(url, key, state, city_name, listing_index, diff,
+                                                                  breaker, prior_attempts.get(url, 0))
+                    if row is not None:
+                        await asyncio.to_thread(resolve_needs_selector, url, needs_selector_pending,
+                                                state, city_name, key)
+                        yield row
+                        continue
+                    failures[bucket].append(failure)
+                    if diff:
+                        listing_url = await asyncio.to_thread(listing_index.resolve, url)
+                        await asyncio.to_thread(diff.keep, listing_url)
+            completed = True
+        finally:
+            await asyncio.to_thread(finish_scrape, failures['failed'], failures['retry'], diff, state, city_name, key,
+                                    write_failures=write_failures, full_run=full_run and completed,
+                                    needs_selector_urls=failures['needs_selector'])
+
+    async def _scrape_one(self, url, key, state, city_name, listing_index, diff, breaker, prior):
+        """
+        (record, None, None) on success, else (None, FailedUrl, bucket) with bucket 'failed',
+        'retry' (cut short by the circuit breaker) or 'needs_selector' (fetched fine, didn't parse)
+        """
+        import aiohttp
+
+        trips_before = breaker.trips
+        last_error = None
+        retry_count = 0
+        while retry_count < MAX_RETRIES:
+            if breaker.trips > trips_before:
+                print(f"  ⚠ Circuit breaker tripped, moving URL to the retry queue: {url}")
+                return None, FailedUrl(url, "Circuit breaker open", prior + retry_count, int(time.time()),
+                                       state, city_name, key), 'retry'
+            backoff = None
+            try:
+                response, page_label = await self.fetch_page(url, DETAIL_PACE, scanner=DetailFieldScanner())
+                if response.status_code == 403:
+                    last_error = "HTTP 403"
+                    backoff = (10, 20)
+                elif response.status_code >= 400:
+                    last_error = f"HTTP {response.status_code}"
+                    backoff = (5 * (retry_count + 1), 10 * (retry_count + 1))
+                else:
+                    if page_label == INTERSTITIAL:
+                        print("  ⚠ Cloudflare challenge detected, waiting...")
+                        response, page_label = await self.fetch_page(url, (10, 15))
+                    if page_label in NON_CONTENT_LABELS:
+                        raise ValueError(f"Got {page_label} page instead of a listing")
+                    business_data = await asyncio.to_thread(parse_listing, response.content, url)
+                    row = await asyncio.to_thread(save_listing, business_data, url, key, state, city_name,
+                                                  listing_index, diff)
+                    print(f"  ✓ Successfully scraped: {business_data.username}")
+                    return row, None, None
+            except ExtractionError as e:
+                # Deterministic: the same body parses the same way, so don't fetch it again
+                html_path = await asyncio.to_thread(save_needs_selector_page, url, response.content, state)
+                print(f"  ✗ {e}; HTML saved to {html_path}, not fetching it again")
+                return None, FailedUrl(url, f"{e} (HTML: {html_path})", prior + retry_count + 1, int(time.time()),
+                                       state, city_name, key), 'needs_selector'
+            except asyncio.TimeoutError as e:
+                last_error = f"Timeout: {e!r}"
+                backoff = (5 * (retry_count + 1), 10 * (retry_count + 1))
+            except aiohttp.ClientError as e:
+                last_error = f"Request error: {e}"
+                backoff = (5 * (retry_count + 1), 10 * (retry_count + 1))
+            except Exception as e:
+                last_error = str(e)
+                backoff = (3, 7)
+
+            retry_count += 1
+            print(f"  ✗ {last_error} (attempt {retry_count}/{MAX_RETRIES}): {url}")
+            if retry_count < MAX_RETRIES:
+                # Backing off outside the host slot leaves the host to the other jobs meanwhile
+                clock = get_clock()
+                await clock.sleep_async(clock.uniform(*backoff))
+
+        print(f"  ✗ Failed to scrape after {MAX_RETRIES} attempts: {url}")
+        return None, FailedUrl(url, last_error or "Unknown error", prior + retry_count, int(time.time()),
+                               state, city_name, key), 'failed'
+
+    def job(self, search_term, state, city_name, resume=True, full_run=False):
+        """
+        Collect a city's URLs and scrape each one as it is found, yielding ListingRecords
+        full_run=False by default: a resumed or cut-short collection doesn't see every listing,
+        so removals are only reported by a full `scrape` run over the URL file.
+        """
+        key = search_term.replace(" ", "_").lower()
+        return self.scrape_listings(self.collect_urls(search_term, state, city_name, resume=resume),
+                                    key, state, city_name, full_run=full_run)
+
+
+# ---------------------- Jobs Runner -----------------------
+async def run_jobs(scraper, jobs, buffer=MERGE_BUFFER, on_record=None):
+    """
+    Run (search term, state, city) jobs concurrently on one scraper until all are done
+    Returns the number of records per job; on_record(record) sees every record as it arrives.
+    """
+    counts = {}
+    streams = [_tag(job, scraper.job(*job)) for job in jobs]
+    async with aclosing(merge_streams(*streams, buffer=buffer)) as merged:
+        async for job, record in merged:
+            counts[job] = counts.get(job, 0) + 1
+            if on_record:
+                on_record(record)
+    print(get_metrics().summary())
+    return counts
+
+
+async def _tag(job, stream):
+    try:
+        async for record in stream:
+            yield job, record
+    finally:
+        await stream.aclose()
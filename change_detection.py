@@ -0,0 +1,184 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import uuid
+
+from manifest import record_write
+from metrics import get_metrics
+
+
+# ---------------------- Configuration -----------------------
+ADDED = 'added'
+CHANGED = 'changed'
+REMOVED = 'removed'
+
+# Positions of Username, Phone Number, Address, Latitude and Longitude in a data CSV row
+HASH_FIELDS = (0, 2, 4, 5, 6)
+
+# Per-run scratch store: the snapshot's hashes and the run's changes, on disk rather than in memory
+SCRATCH_SCHEMA = """
+CREATE TABLE file_hashes (content_hash TEXT PRIMARY KEY);
+CREATE TABLE changes (seq INTEGER PRIMARY KEY, change TEXT, url TEXT, content_hash TEXT, row TEXT);
+"""
+
+
+# ---------------------- Content Hashes -----------------------
+def _normalize(value):
+    value = '' if value in (None, 'N/A') else str(value)
+    return re.sub(r'\s+', ' ', value).strip().casefold()
+
+
+def content_hash(row):
+    """
+    Hash of the normalized extracted fields of a data row
+    Case, whitespace and phone formatting don't count as changes
+    """
+    name, phone, address, latitude, longitude = (row[i] if i < len(row) else '' for i in HASH_FIELDS)
+    fields = (
+        _normalize(name),
+        re.sub(r'\D', '', _normalize(phone)),
+        _normalize(address),
+        _normalize(latitude),
+        _normalize(longitude),
+    )
+    return hashlib.blake2b('\x1f'.join(fields).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def iter_snapshot_hashes(filepath):
+    """Content hash of each row currently in a data CSV"""
+    if not os.path.exists(filepath):
+        return
+    with open(filepath, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for row in reader:
+            yield content_hash(row)
+
+
+def compact_snapshot(filepath, drop_hashes):
+    """Rewrite a data CSV without the rows whose content hash is in drop_hashes; returns rows dropped"""
+    if not drop_hashes or not os.path.exists(filepath):
+        return 0
+    tmp_path = f"{filepath}.tmp"
+    kept = dropped = 0
+    with open(filepath, mode='r', newline='', encoding='utf-8') as source, \
+            open(tmp_path, mode='w', newline='', encoding='utf-8') as target:
+        reader = csv.reader(source)
+        writer = csv.writer(target)
+        header = next(reader, None)
+        if header:
+            writer.writerow(header)
+        for row in reader:
+            if content_hash(row) in drop_hashes:
+                dropped += 1
+            else:
+                writer.writerow(row)
+                kept += 1
+    os.replace(tmp_path, filepath)
+    record_write(filepath, kept, header or [], replaced=True)
+    return dropped
+
+
+# ---------------------- Run Diff -----------------------
+class SnapshotDiff:
+    """
+    Change detection for one city/provider data CSV over a scrape run
+    The listing index remembers the content hash last written for each listing; check()
+    compares against it and tells the caller whether the row needs writing. finish() drops
+    superseded and removed rows from the snapshot and counts the run's changes, which
+    iter_changes() then reads back.
+    Memory doesn't grow with the URL stream: which listings the run saw is kept in the index
+    (memberships tagged with a run id), the snapshot hashes and changes in a temporary database.
+    """
+
+    def __init__(self, index, filepath, state, city_name, provider_type):
+        self.index = index
+        self.filepath = filepath
+        self.output = (state, city_name, provider_type)
+        self.run = uuid.uuid4().hex
+        # '' opens a private temporary database, deleted when closed
+        self.scratch = sqlite3.connect('', isolation_level=None, check_same_thread=False)
+        self.scratch.executescript(SCRATCH_SCHEMA)
+        self.scratch.executemany("INSERT OR IGNORE INTO file_hashes VALUES (?)",
+                                 ((row_hash,) for row_hash in iter_snapshot_hashes(filepath)))
+        self.seen = 0
+        self.drop_hashes = set()
+        self.unchanged = 0
+
+    def _in_file(self, row_hash):
+        return self.scratch.execute("SELECT 1 FROM file_hashes WHERE content_hash = ?", (row_hash,)).fetchone() is not None
+
+    def _record(self, change, url, row_hash, row):
+        self.scratch.execute("INSERT INTO changes (change, url, content_hash, row) VALUES (?, ?, ?, ?)",
+                             (change, url, row_hash, json.dumps(list(row)) if row else None))
+
+    def keep(self, listing_url):
+        """Count a listing as present even though it wasn't re-extracted (e.g. its fetch failed)"""
+        if listing_url:
+            self.index.mark_seen(listing_url, *self.output, self.run)
+            self.seen += 1
+
+    def check(self, url, listing_url, row):
+        """Record the row of a listing extracted this run; True if it has to be written"""
+        if self.index.seen_in_run(listing_url, *self.output, self.run):
+            return False
+        self.seen += 1
+
+        row_hash = content_hash(row)
+        previous = self.index.update_membership(listing_url, *self.output, row_hash, run=self.run)
+        metrics = get_metrics()
+        in_file = self._in_file(row_hash)
+        if in_file and previous in (row_hash, None):
+            # Same content as the snapshot already holds (None: a row written before hashes were kept)
+            self.unchanged += 1
+            metrics.incr('delta.unchanged')
+            return False
+
+        if previous is not None and self._in_file(previous):
+            change = CHANGED
+            self.drop_hashes.add(previous)
+        else:
+            change = ADDED
+        self._record(change, url, row_hash, row)
+        metrics.incr(f'delta.{change}')
+        # Another listing may already have put identical content in the snapshot
+        if in_file:
+            return False
+        self.scratch.execute("INSERT INTO file_hashes VALUES (?)", (row_hash,))
+        return True
+
+    def finish(self, detect_removed=True):
+        """
+        Close the run: listings of this output not seen in it are reported as removed when
+        detect_removed is set (only meaningful when the run covered the whole URL list)
+        Returns {change: count} of the run's changes.
+        """
+        if detect_removed and self.seen:
+            removed = self.index.membership_hashes(*self.output, unseen_in_run=self.run)
+            for url, row_hash in removed.items():
+                self._record(REMOVED, url, row_hash, None)
+                self.drop_hashes.add(row_hash)
+            if removed:
+                self.index.remove_memberships(removed, *self.output)
+                get_metrics().incr('delta.removed', len(removed))
+
+        # A hash still held by a listing seen this run stays in the snapshot
+        held = self.index.hashes_seen_in_run(*self.output, self.run, self.drop_hashes)
+        dropped = compact_snapshot(self.filepath, self.drop_hashes - held)
+        if dropped:
+            print(f"Dropped {dropped} superseded/removed rows from {self.filepath}")
+        counts = dict.fromkeys((ADDED, CHANGED, REMOVED), 0)
+        counts.update(self.scratch.execute("SELECT change, count(*) FROM changes GROUP BY change"))
+        return counts
+
+    def iter_changes(self):
+        """The run's (change, url, content_hash, row) tuples in detection order; row is None for removals"""
+        cursor = self.scratch.execute("SELECT change, url, content_hash, row FROM changes ORDER BY seq")
+        for change, url, row_hash, row in cursor:
+            yield change, url, row_hash, json.loads(row) if row else None
+
+    def close(self):
+        self.scratch.close()
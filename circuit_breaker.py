@@ -0,0 +1,174 @@
+import threading
+from collections import deque
+
+from clock import get_clock
+from metrics import get_metrics
+
+
+# ---------------------- Configuration -----------------------
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 10
+LATENCY_PERCENTILE = 0.95
+LATENCY_MULTIPLIER = 3.0
+MIN_TIMEOUT = 10
+
+BREAKER_WINDOW = 20
+BREAKER_MIN_REQUESTS = 10
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_COOLDOWN = 120
+BREAKER_MAX_COOLDOWN = 1800
+# A probe that never reported back (e.g. its task was cancelled) frees the half-open slot after this
+BREAKER_PROBE_TIMEOUT = 90
+# How often requests held back by a half-open breaker check whether the probe is done
+PROBE_POLL_INTERVAL = 1.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LatencyTracker:
+    """
+    Sliding window of successful response latencies
+    timeout() derives a request timeout from the observed percentile instead of a fixed value
+    """
+
+    def __init__(self, window=LATENCY_WINDOW, percentile=LATENCY_PERCENTILE,
+                 multiplier=LATENCY_MULTIPLIER, min_samples=LATENCY_MIN_SAMPLES):
+        self.samples = deque(maxlen=window)
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def quantile(self, q):
+        with self.lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def timeout(self, max_timeout, min_timeout=MIN_TIMEOUT):
+        """percentile * multiplier clamped to [min_timeout, max_timeout]; max_timeout until warmed up"""
+        if len(self.samples) < self.min_samples:
+            return max_timeout
+        return max(min_timeout, min(max_timeout, self.quantile(self.percentile) * self.multiplier))
+
+
+class CircuitBreaker:
+    """
+    Run-level circuit breaker over a sliding window of request outcomes
+    When the failure rate crosses the threshold the breaker opens: before_request() then
+    pauses all fetching for a cool-down, lets a single probe through (half-open) and closes
+    again if it succeeds; a failed probe re-opens it with a doubled cool-down. While the
+    probe is out, every other request waits for its outcome.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW, min_requests=BREAKER_MIN_REQUESTS,
+                 failure_rate=BREAKER_FAILURE_RATE, cooldown=BREAKER_COOLDOWN,
+                 max_cooldown=BREAKER_MAX_COOLDOWN, probe_timeout=BREAKER_PROBE_TIMEOUT):
+        self.outcomes = deque(maxlen=window)
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.probe_timeout = probe_timeout
+        self.probe_started = None
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.state != CLOSED
+
+    def _open(self, now):
+        self.state = OPEN
+        self.open_until = now + self.cooldown
+        self.probe_started = None
+        self.trips += 1
+        get_metrics().incr('circuit_breaker.trips')
+        print(f"⚠ Circuit breaker open: pausing all requests for {self.cooldown:.0f} seconds")
+
+    def try_acquire(self):
+        """
+        Non-blocking admission check: 0 if a request may go out now, else the seconds to wait
+        before asking again. The first request after the cool-down becomes the only probe.
+        """
+        now = get_clock().now()
+        with self.lock:
+            if self.state == CLOSED:
+                return 0.0
+            if self.state == OPEN:
+                if now < self.open_until:
+                    return self.open_until - now
+                self.state = HALF_OPEN
+                print("Circuit breaker half-open: probing...")
+            elif self.probe_started is not None and now < self.probe_started + self.probe_timeout:
+                return min(PROBE_POLL_INTERVAL, self.probe_started + self.probe_timeout - now)
+            self.probe_started = now
+            return 0.0
+
+    def before_request(self):
+        """Block while the breaker is open or its probe is out"""
+        clock = get_clock()
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            clock.sleep(wait)
+
+    async def before_request_async(self):
+        """before_request for the asyncio scraper: waits without blocking the event loop"""
+        clock = get_clock()
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await clock.sleep_async(wait)
+
+    def record(self, success):
+        clock = get_clock()
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probe_started = None
+                if success:
+                    print("✓ Probe succeeded, circuit breaker closed")
+                    self.state = CLOSED
+                    self.cooldown = self.base_cooldown
+                    self.outcomes.clear()
+                else:
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                    self._open(clock.now())
+                return
+
+            self.outcomes.append(success)
+            if self.state == CLOSED and len(self.outcomes) >= self.min_requests:
+                failures = self.outcomes.count(False)
+                if failures / len(self.outcomes) >= self.failure_rate:
+                    self._open(clock.now())
+
+
+_latency_tracker = LatencyTracker()
+_breaker = CircuitBreaker()
+
+
+def get_latency_tracker():
+    return _latency_tracker
+
+
+def get_breaker():
+    return _breaker
+
+
+def reset_run_health():
+    """Fresh latency window and breaker; called at the start of every scrape run"""
+    global _latency_tracker, _breaker
+    _latency_tracker = LatencyTracker()
+    _breaker = CircuitBreaker()
@@ -0,0 +1,435 @@
+"""
+Command line entry point: python -m cli <command> [options]
+
+Only argparse is imported up front; each command imports the modules it needs when it runs,
+so `--help` and the cheap commands (export, bench imports) never load requests, bs4,
+cloudscraper, pandas or pyarrow.
+"""
+import argparse
+import sys
+import time
+
+
+# ---------------------- Commands -----------------------
+def cmd_collect(args):
+    """Collect business URLs from the search result pages"""
+    from main import scrape_yellow_pages
+
+    scrape_yellow_pages(args.search_term, args.state, args.city, use_cloudscraper=not args.no_cloudscraper,
+                        resume=not args.restart)
+
+
+def cmd_plan(args):
+    """Plan a reduced set of city searches covering a state"""
+    from coverage_planner import sweep_plan, print_report, GAZETTEER_FILE
+
+    plan = sweep_plan(args.state, args.search_term, args.gazetteer or GAZETTEER_FILE, args.covered, args.min_yield)
+    if plan is None:
+        sys.exit(f"No cities of {args.state.upper()} in the gazetteer")
+    print_report(plan, args.state, args.search_term)
+
+    if args.collect:
+        from main import scrape_yellow_pages
+
+        for search in plan['planned']:
+            print(f"\n=== {search.city.city}, {search.city.state} ===")
+            scrape_yellow_pages(args.search_term, search.city.state, search.city.city,
+                                use_cloudscraper=not args.no_cloudscraper)
+
+
+def cmd_scrape(args):
+    """Scrape business details from collected URLs"""
+    from scrape_urls import iter_urls_from_csv, scrape_url
+    from transport import get_shared_session, establish_session
+    from url_sources import iter_url_sources, parse_shard, shard_urls
+
+    shard_index, shard_count = parse_shard(args.shard)
+    use_cloudscraper = not args.no_cloudscraper
+
+    if args.sources:
+        urls = iter_url_sources(args.sources)
+    else:
+        urls = iter_urls_from_csv(args.state, args.city, args.key)
+    urls = shard_urls(urls, shard_index, shard_count)
+
+    print(f"Starting scraper (shard {shard_index}/{shard_count})...")
+    try:
+        session = get_shared_session(use_cloudscraper=use_cloudscraper)
+
+        # First, establish session by visiting homepage
+        establish_session(session, use_cloudscraper=use_cloudscraper)
+
+        result = scrape_url(urls, session, args.key, args.state, args.city, use_cloudscraper=use_cloudscraper,
+                            full_run=shard_count == 1 and not args.partial)
+        if not any(result.values()):
+            print("No URLs found to scrape.")
+
+    except KeyboardInterrupt:
+        print("\nScraping interrupted by user")
+    except Exception as e:
+        print(f"Fatal error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        print("\nScraping completed!")
+
+
+def cmd_jobs(args):
+    """Collect and scrape several cities concurrently on one event loop"""
+    import asyncio
+    from async_scraper import AIOHTTP_AVAILABLE, AsyncScraper, run_jobs
+    from circuit_breaker import reset_run_health
+
+    if not AIOHTTP_AVAILABLE:
+        sys.exit("Concurrent jobs need aiohttp: pip install aiohttp")
+    jobs = []
+    for location in args.locations:
+        state, _, city = location.partition(':')
+        if not (state and city):
+            sys.exit(f"Expected STATE:City, got {location!r}")
+        jobs.append((args.search_term, state.upper(), city))
+
+    async def run():
+        reset_run_health()
+        async with AsyncScraper() as scraper:
+            return await run_jobs(scraper, jobs, buffer=args.buffer)
+
+    try:
+        counts = asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nJobs interrupted by user; collections resume where they stopped")
+        return
+    for job in jobs:
+        print(f"{job[2]}, {job[1]}: {counts.get(job, 0)} listings")
+
+
+def cmd_retry(args):
+    """Retry the failed URLs of a state whose backoff has elapsed"""
+    from retry_failed import retry_failures, MAX_ATTEMPTS
+
+    retry_failures(args.state, args.city, args.provider, use_cloudscraper=not args.no_cloudscraper,
+                   max_attempts=args.max_attempts or MAX_ATTEMPTS, include_retry_queue=not args.no_retry_queue)
+
+
+def cmd_export(args):
+    """Write a zip bundle of a state folder's output files"""
+    import os
+    from exports import select_files, write_bundle
+
+    folder = args.state.upper()
+    files = select_files(folder, args.provider)
+    if not files:
+        sys.exit(f"No output files found in {folder}")
+
+    if args.output == '-':
+        write_bundle(folder, list(files), sys.stdout.buffer)
+        return
+    output = args.output or f"{folder.lower()}_{args.provider or 'all'}.zip".replace(" ", "_").lower()
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, mode='wb') as file:
+        write_bundle(folder, list(files), file)
+    os.replace(tmp_path, output)
+    print(f"✓ Exported {len(files)} files to {output} ({os.path.getsize(output) / 1024:.1f} KB)")
+
+
+def cmd_serve(args):
+    """Serve the scraped listings as a read-only JSON API"""
+    from results_api import serve
+
+    serve(args.host, args.port, verbose=args.verbose)
+
+
+# ---------------------- Benchmarks -----------------------
+# Modules timed by `bench imports`: the entry points and the heavy dependencies they may pull in
+BENCH_MODULES = ['cli', 'exports', 'records', 'transport', 'main', 'scrape_urls', 'retry_failed',
+                 'spatial_index', 'normalize']
+
+
+def import_time_us(module):
+    """Cumulative import time of a module in a fresh interpreter (python -X importtime), in µs"""
+    import subprocess
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True)
+    for line in reversed(result.stderr.splitlines()):
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    return None
+
+
+def bench_imports(args):
+    for module in args.modules or BENCH_MODULES:
+        times = [t for t in (import_time_us(module) for _ in range(args.runs)) if t is not None]
+        if not times:
+            print(f"{module:>15}: import failed")
+            continue
+        print(f"{module:>15}: {min(times) / 1000:7.1f} ms (best of {len(times)})")
+
+
+def bench_extract(args):
+    from bs4 import BeautifulSoup
+    from page_archive import get_page_archive
+    from page_classifier import LISTING
+    from scrape_urls import extract_business_data
+
+    archive = get_page_archive()
+    if archive is None:
+        sys.exit("The page archive needs zstandard: pip install zstandard")
+    pages = [(url, content) for url, _, content in archive.iter_pages(label=LISTING)][:args.limit]
+    if not pages:
+        sys.exit("No archived listing pages to parse")
+
+    start = time.perf_counter()
+    extracted = sum(1 for url, content in pages
+                    if extract_business_data(BeautifulSoup(content, 'html.parser'), url).username)
+    elapsed = time.perf_counter() - start
+    print(f"Parsed {len(pages)} archived listing pages in {elapsed:.2f}s "
+          f"({len(pages) / elapsed:.0f} pages/s), {extracted} with a business name")
+
+
+def bench_normalize(args):
+    from normalize import load_state_frame, normalize_frame
+
+    for state in args.states:
+        df = load_state_frame(state)
+        if df.empty:
+            print(f"No data files found for {state.upper()}")
+            continue
+        start = time.perf_counter()
+        normalize_frame(df)
+        elapsed = time.perf_counter() - start
+        print(f"{state.upper()}: normalized {len(df)} rows in {elapsed:.2f}s ({len(df) / elapsed:.0f} rows/s)")
+
+
+def bench_spatial(args):
+    import numpy as np
+    from spatial_index import SpatialIndex
+
+    index = SpatialIndex()
+    start = time.perf_counter()
+    index.refresh()
+    built = time.perf_counter()
+    if not len(index):
+        sys.exit("No listings with coordinates to index")
+    print(f"Indexed {len(index)} points in {built - start:.2f}s")
+
+    # Query around indexed points, so every query hits populated cells
+    rng = np.random.default_rng(0)
+    positions = rng.integers(0, len(index), args.queries)
+    start = time.perf_counter()
+    found = sum(len(index.radius(index.lats[p], index.lons[p], args.miles)) for p in positions)
+    elapsed = time.perf_counter() - start
+    print(f"{args.queries} radius queries ({args.miles} mi) in {elapsed:.2f}s: "
+          f"{elapsed / args.queries * 1000:.2f} ms each, {found / args.queries:.0f} results on average")
+
+
+# Listing page served by `bench scrape` when the page archive has none; the filler stands in for
+# the related listings and scripts that follow the contact block on real pages
+BENCH_LISTING_PAGE = """<html><head><title>Bench Dental {i}</title></head><body>
+<div class="sales-info"><h1>Bench Dental {i}</h1></div>
+<div id="default-ctas"><a class="phone dockable">(555) 010-{i:04d}</a><span class="address">{i} Main St, Aberdeen, WA</span></div>
+<script type="application/ld+json">{{"geo": {{"latitude": 46.97, "longitude": -123.81}}}}</script>
+{filler}</body></html>"""
+
+
+def canned_listing_pages(limit):
+    """Archived listing pages (up to limit), or generated ones when the archive has none"""
+    import os
+    from page_archive import PageArchive, ZSTD_AVAILABLE, ARCHIVE_DIR
+    from page_classifier import LISTING
+
+    if ZSTD_AVAILABLE and os.path.isdir(ARCHIVE_DIR):
+        # A private instance: the run's own archive is opened later, inside the scratch directory
+        archive = PageArchive()
+        try:
+            pages = [content for _, _, content in archive.iter_pages(label=LISTING)][:limit]
+        finally:
+            archive.close()
+        if pages:
+            return pages, "archived"
+    filler = "<div class='related'>" + "x" * 60_000 + "</div>"
+    return [BENCH_LISTING_PAGE.format(i=i, filler=filler).encode() for i in range(limit)], "generated"
+
+
+def bench_scrape(args):
+    import contextlib
+    import io
+    import os
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from clock import VirtualClock, use_clock
+    from metrics import get_metrics
+    from scrape_urls import get_session, scrape_url
+
+    pages, source = canned_listing_pages(args.limit)
+
+    class CannedPages(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages[int(self.path.rsplit('/', 1)[-1])]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CannedPages)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/mip/{i}" for i in range(len(pages))]
+
+    # Output files, archive and listing index of the run go to a scratch directory
+    cwd = os.getcwd()
+    log = io.StringIO()
+    try:
+        with tempfile.TemporaryDirectory() as scratch, use_clock(VirtualClock(seed=args.seed)) as clock:
+            os.chdir(scratch)
+            session = get_session(use_cloudscraper=False)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+                result = scrape_url(urls, session, "bench", "BENCH", "Bench", use_cloudscraper=False,
+                                    stream_pages=not args.no_stream)
+            elapsed = time.perf_counter() - start
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    metrics = get_metrics()
+    print(f"Scraped {result['succeeded']}/{len(pages)} {source} listing pages in {elapsed:.2f}s "
+          f"({len(pages) / elapsed:.0f} pages/s), {metrics.counters['streaming.cut_off']} cut off early")
+    print(f"Simulated delays: {clock.total_slept / 60:.1f} min over {len(clock.sleeps)} sleeps "
+          f"({clock.total_slept / len(pages):.1f} s per page)")
+
+
+def bench_api(args):
+    from api_loadtest import run_load_test, print_report
+
+    result = run_load_test(args.url, args.concurrency, args.duration, args.conditional)
+    print_report(result, args.concurrency)
+
+
+def bench_records(args):
+    from records import measure_buffers
+
+    for name, used in measure_buffers(args.count).items():
+        print(f"{name:>15}: {used / 1024 / 1024:6.1f} MB per {args.count} buffered ({used / args.count:.0f} bytes each)")
+
+
+# ---------------------- Parser -----------------------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="YellowPages scraper")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    collect = subparsers.add_parser('collect', help=cmd_collect.__doc__)
+    collect.add_argument('search_term', nargs='?', default="dental care", help="Search term (default: dental care)")
+    collect.add_argument('--state', default="WA")
+    collect.add_argument('--city', default="Aberdeen")
+    collect.add_argument('--restart', action='store_true',
+                         help="Start at page 1 even if an earlier run of this search stopped part way")
+    collect.add_argument('--no-cloudscraper', action='store_true', help="Use plain requests even if cloudscraper is installed")
+    collect.set_defaults(handler=cmd_collect)
+
+    plan = subparsers.add_parser('plan', help=cmd_plan.__doc__)
+    plan.add_argument('state', help="State, e.g. WA")
+    plan.add_argument('search_term', nargs='?', default="dental care", help="Search term (default: dental care)")
+    plan.add_argument('--gazetteer', default=None,
+                      help="City list: the bundled gazetteer.csv (default) or a Census Gazetteer places file")
+    plan.add_argument('--covered', type=float, default=0.8,
+                      help="Share of a city's listings the plan has to reach (default: 0.8)")
+    plan.add_argument('--min-yield', type=float, default=3.0,
+                      help="Skip searches expected to add fewer new listings per page (default: 3)")
+    plan.add_argument('--collect', action='store_true', help="Collect URLs for the planned cities, in plan order")
+    plan.add_argument('--no-cloudscraper', action='store_true', help="Use plain requests even if cloudscraper is installed")
+    plan.set_defaults(handler=cmd_plan)
+
+    scrape = subparsers.add_parser('scrape', help=cmd_scrape.__doc__)
+    scrape.add_argument('sources', nargs='*',
+                        help="URL sources: CSV/text files, glob patterns or '-' for stdin "
+                             "(default: the URL CSV of --state/--city/--key)")
+    scrape.add_argument('--state', default="wa")
+    scrape.add_argument('--city', default="aberdeen")
+    scrape.add_argument('--key', default="dental care", help="Provider type used in output file names")
+    scrape.add_argument('--shard', default="0/1", help="Only scrape shard i of n (0-based), e.g. 2/8")
+    scrape.add_argument('--partial', action='store_true',
+                        help="The sources are only part of the city's URLs: don't report missing listings as removed")
+    scrape.add_argument('--no-cloudscraper', action='store_true', help="Use plain requests even if cloudscraper is installed")
+    scrape.set_defaults(handler=cmd_scrape)
+
+    jobs = subparsers.add_parser('jobs', help=cmd_jobs.__doc__)
+    jobs.add_argument('search_term', help="Search term, e.g. 'dental care'")
+    jobs.add_argument('locations', nargs='+', help="Cities as STATE:City, e.g. WA:Aberdeen GA:Atlanta")
+    jobs.add_argument('--buffer', type=int, default=100,
+                      help="Records buffered before every job pauses for the consumer (default: 100)")
+    jobs.set_defaults(handler=cmd_jobs)
+
+    retry = subparsers.add_parser('retry', help=cmd_retry.__doc__)
+    retry.add_argument('state', nargs='?', default="WA", help="State folder (default: WA)")
+    retry.add_argument('--city', default=None, help="Only this city")
+    retry.add_argument('--provider', default=None, help="Only this provider type, e.g. dental_care")
+    retry.add_argument('--max-attempts', type=int, default=None,
+                       help="Attempts before a URL goes to the dead-letter file (default: retry_failed.MAX_ATTEMPTS)")
+    retry.add_argument('--no-retry-queue', action='store_true', help="Leave the *_retry.csv queue alone")
+    retry.add_argument('--no-cloudscraper', action='store_true', help="Use plain requests even if cloudscraper is installed")
+    retry.set_defaults(handler=cmd_retry)
+
+    export = subparsers.add_parser('export', help=cmd_export.__doc__)
+    export.add_argument('state', help="State folder, e.g. WA")
+    export.add_argument('--provider', default=None, help="Only this provider type, e.g. dental_care")
+    export.add_argument('-o', '--output', default=None,
+                        help="Zip file to write, or '-' for stdout (default: [state]_[provider|all].zip)")
+    export.set_defaults(handler=cmd_export)
+
+    serve = subparsers.add_parser('serve', help=cmd_serve.__doc__)
+    serve.add_argument('--host', default="127.0.0.1")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--verbose', action='store_true', help="Log every request")
+    serve.set_defaults(handler=cmd_serve)
+
+    bench = subparsers.add_parser('bench', help="Benchmarks")
+    benches = bench.add_subparsers(dest='bench', required=True)
+    imports = benches.add_parser('imports', help="Import time of each module in a fresh interpreter")
+    imports.add_argument('modules', nargs='*', help=f"Modules to time (default: {' '.join(BENCH_MODULES)})")
+    imports.add_argument('--runs', type=int, default=3)
+    imports.set_defaults(handler=bench_imports)
+    extract = benches.add_parser('extract', help="Parse archived listing pages")
+    extract.add_argument('--limit', type=int, default=1000)
+    extract.set_defaults(handler=bench_extract)
+    normalize = benches.add_parser('normalize', help="Normalize the data of one or more states")
+    normalize.add_argument('states', nargs='+')
+    normalize.set_defaults(handler=bench_normalize)
+    spatial = benches.add_parser('spatial', help="Build the spatial index and run radius queries")
+    spatial.add_argument('--queries', type=int, default=1000)
+    spatial.add_argument('--miles', type=float, default=10)
+    spatial.set_defaults(handler=bench_spatial)
+    api = benches.add_parser('api', help="Load-test a running results API (python -m cli serve)")
+    api.add_argument('--url', default="http://127.0.0.1:8765")
+    api.add_argument('--concurrency', type=int, default=8, help="Keep-alive connections")
+    api.add_argument('--duration', type=float, default=10, help="Seconds to run")
+    api.add_argument('--conditional', type=float, default=0.5,
+                     help="Share of requests sent with If-None-Match (default: 0.5)")
+    api.set_defaults(handler=bench_api)
+    scrape = benches.add_parser('scrape', help="Run scrape_url against canned pages on a virtual clock")
+    scrape.add_argument('--limit', type=int, default=200, help="Listing pages to scrape (default: 200)")
+    scrape.add_argument('--seed', type=int, default=0, help="Seed of the virtual clock's jitter")
+    scrape.add_argument('--no-stream', action='store_true', help="Read every page in full")
+    scrape.add_argument('--verbose', action='store_true', help="Show the scraper's log")
+    scrape.set_defaults(handler=bench_scrape)
+    records = benches.add_parser('records', help="Memory of buffered records vs dicts / lists")
+    records.add_argument('--count', type=int, default=100_000)
+    records.set_defaults(handler=bench_records)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+
+
+class SystemClock:
+    """
+    Real clock used by the scrapers by default
+    Sleeps block for real and jitter comes from a (optionally seeded) RNG
+    """
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def sleep_async(self, seconds):
+        """Sleep for the asyncio scraper: yields to the event loop instead of blocking it"""
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def uniform(self, min_sec, max_sec):
+        return self.rng.uniform(min_sec, max_sec)
+
+
+class VirtualClock:
+    """
+    Simulated clock for tests and benchmarks
+    sleep() advances the virtual time instantly and records the schedule as
+    (virtual_time, seconds) pairs, so pacing can be checked deterministically
+    """
+
+    def __init__(self, seed=0, start=0.0):
+        self.rng = random.Random(seed)
+        self.current = start
+        self.sleeps = []
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        self.sleeps.append((self.current, seconds))
+        self.current += seconds
+
+    async def sleep_async(self, seconds):
+        self.sleep(seconds)
+        # Still let the other tasks run, as a real sleep would
+        await asyncio.sleep(0)
+
+    def uniform(self, min_sec, max_sec):
+        return self.rng.uniform(min_sec, max_sec)
+
+    @property
+    def total_slept(self):
+        return sum(seconds for _, seconds in self.sleeps)
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    """Return the clock every delay in the scrapers goes through"""
+    return _clock
+
+
+def set_clock(clock):
+    """Install a new clock and return the previous one"""
+    global _clock
+    previous = _clock
+    _clock = clock
+    return previous
+
+
+@contextmanager
+def use_clock(clock):
+    """Temporarily install a clock, e.g. `with use_clock(VirtualClock(seed=1)):`"""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
@@ -0,0 +1,381 @@
+import csv
+import math
+import os
+from collections import Counter
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from main import MAX_PAGES
+from page_archive import ARCHIVE_DIR, get_page_archive
+from providers import PROVIDER_TYPES
+from records import read_records
+from scrape_urls import output_path
+from spatial_index import haversine_miles
+from url_sources import canonical_url, iter_csv_urls
+
+
+# ---------------------- Configuration -----------------------
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv")
+
+SEARCH_URL_PREFIX = "https://www.yellowpages.com/search?"
+RESULTS_PER_PAGE = 30
+
+# Search radius used before any city of the state was scraped
+DEFAULT_RADIUS_MILES = 15.0
+MIN_RADIUS_MILES = 3.0
+MAX_RADIUS_MILES = 60.0
+# A scraped city's radius is this quantile of its listings' distances from the city center
+RADIUS_QUANTILE = 0.9
+# Fewer listings than this say little about a city's radius
+MIN_RADIUS_SAMPLES = 10
+
+# Listings per resident assumed before any city of the state was collected
+DEFAULT_LISTINGS_PER_RESIDENT = 1 / 1000
+
+# A city counts as covered once the planned searches are expected to return this share of its listings
+COVERED_SHARE = 0.8
+# A search expected to add fewer new listings per page than this isn't planned, even if its city
+# stays under-covered
+MIN_NEW_PER_PAGE = 3.0
+
+
+class GazetteerCity(NamedTuple):
+    state: str
+    city: str
+    latitude: float
+    longitude: float
+    population: int
+
+
+class CityObservation(NamedTuple):
+    """What an earlier collection of one city search found"""
+    urls: frozenset
+    lats: np.ndarray
+    lons: np.ndarray
+    pages: int
+    pages_archived: bool
+
+
+# ---------------------- Gazetteer -----------------------
+def _place_name(name):
+    """Census place names carry the place type ('Aberdeen city', 'Silverdale CDP')"""
+    for suffix in (' city', ' town', ' village', ' CDP', ' borough', ' municipality'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def load_gazetteer(state, path=GAZETTEER_FILE):
+    """
+    Cities of a state with coordinates, largest first
+    Reads the bundled State,City,Latitude,Longitude,Population CSV, or a Census Gazetteer
+    places file (tab-separated USPS, NAME, INTPTLAT, INTPTLONG) for full state coverage
+    """
+    with open(path, mode='r', newline='', encoding='utf-8') as file:
+        header = file.readline()
+        file.seek(0)
+        census = '\t' in header
+        reader = csv.DictReader(file, delimiter='\t' if census else ',')
+        cities = []
+        for row in reader:
+            row = {name.strip(): (value or '').strip() for name, value in row.items() if name}
+            if census:
+                row_state, name = row['USPS'], _place_name(row['NAME'])
+                lat, lon, population = row['INTPTLAT'], row['INTPTLONG'], row.get('POP', 0) or 0
+            else:
+                row_state, name = row['State'], row['City']
+                lat, lon, population = row['Latitude'], row['Longitude'], row.get('Population', 0) or 0
+            if row_state.upper() == state.upper():
+                cities.append(GazetteerCity(state.upper(), name, float(lat), float(lon), int(population)))
+    return sorted(cities, key=lambda c: (-c.population, c.city))
+
+
+# ---------------------- Observed Results -----------------------
+def provider_keys(search_term):
+    """File name keys a search term's outputs may be saved under (search term or provider type key)"""
+    term = search_term.strip().lower()
+    keys = [term.replace(" ", "_")]
+    keys += [key for key, value in PROVIDER_TYPES.items() if value == term]
+    return list(dict.fromkeys(keys + [key.replace('-', '_') for key in keys]))
+
+
+def search_page_counts(search_term):
+    """Search pages fetched per lowercase 'City, ST', counted from the page archive"""
+    counts = Counter()
+    if not os.path.isdir(ARCHIVE_DIR):
+        return counts
+    archive = get_page_archive()
+    if archive is None:
+        return counts
+    for url, _, _, _ in archive.fetches(SEARCH_URL_PREFIX):
+        query = parse_qs(urlsplit(url).query)
+        if query.get('search_terms', [''])[0].lower() == search_term.lower():
+            counts[query.get('geo_location_terms', [''])[0].lower()] += 1
+    return counts
+
+
+def observe_city(city, search_term, page_counts):
+    """URLs, listing distances and search pages of an earlier collection of a city, or None"""
+    urls_path = output_path(city.state, city.city, search_term.replace(" ", "_").lower(), 'urls')
+    if not os.path.exists(urls_path):
+        return None
+    urls = frozenset(canonical_url(url) for url in iter_csv_urls(urls_path))
+
+    lats, lons = [], []
+    for key in provider_keys(search_term):
+        data_path = output_path(city.state, city.city, key)
+        if os.path.exists(data_path):
+            for record in read_records(data_path):
+                try:
+                    lat, lon = float(record.latitude), float(record.longitude)
+                except ValueError:
+                    continue
+                if abs(lat) <= 90 and abs(lon) <= 180 and (lat, lon) != (0.0, 0.0):
+                    lats.append(lat)
+                    lons.append(lon)
+            break
+    pages = page_counts.get(f"{city.city}, {city.state}".lower(), 0)
+    archived = pages > 0
+    if not archived:
+        # Not in the archive: the pages it took to list the URLs at RESULTS_PER_PAGE each
+        pages = max(math.ceil(len(urls) / RESULTS_PER_PAGE), 1)
+    return CityObservation(urls, np.array(lats), np.array(lons), pages, archived)
+
+
+# ---------------------- Coverage Model -----------------------
+def disc_overlap(d, r_search, r_city):
+    """Share of a city's disc (radius r_city) inside a search disc (radius r_search) d miles away"""
+    if d >= r_search + r_city:
+        return 0.0
+    if d <= abs(r_search - r_city):
+        return 1.0 if r_search >= r_city else (r_search / r_city) ** 2
+    a = r_search ** 2 * math.acos((d * d + r_search ** 2 - r_city ** 2) / (2 * d * r_search))
+    b = r_city ** 2 * math.acos((d * d + r_city ** 2 - r_search ** 2) / (2 * d * r_city))
+    c = 0.5 * math.sqrt((-d + r_search + r_city) * (d + r_search - r_city)
+                        * (d - r_search + r_city) * (d + r_search + r_city))
+    return (a + b - c) / (math.pi * r_city ** 2)
+
+
+def _has_points(observation):
+    return observation is not None and len(observation.lats) >= MIN_RADIUS_SAMPLES
+
+
+def city_radii(cities, observations):
+    """
+    Search radius of every city: the RADIUS_QUANTILE distance of its scraped listings from
+    its center, or the median of the scraped cities' radii for cities not scraped yet
+    """
+    radii = [None] * len(cities)
+    for i, (city, observation) in enumerate(zip(cities, observations)):
+        if _has_points(observation):
+            distances = haversine_miles(city.latitude, city.longitude, observation.lats, observation.lons)
+            radius = float(np.quantile(distances, RADIUS_QUANTILE))
+            radii[i] = min(max(radius, MIN_RADIUS_MILES), MAX_RADIUS_MILES)
+    measured = [radius for radius in radii if radius is not None]
+    default = float(np.median(measured)) if measured else DEFAULT_RADIUS_MILES
+    return [default if radius is None else radius for radius in radii], default
+
+
+def attribute_listings(observations):
+    """
+    Split the collected URLs into disjoint per-city buckets: the collected city with the most
+    URLs keeps all of its URLs, the next one the URLs not already taken, and so on
+    Nearby cities return largely the same listings, so this keeps them from being counted twice
+    """
+    own = [None] * len(observations)
+    taken = set()
+    order = sorted((i for i, observation in enumerate(observations) if observation is not None),
+                   key=lambda i: -len(observations[i].urls))
+    for i in order:
+        own[i] = observations[i].urls - taken
+        taken |= observations[i].urls
+    return own
+
+
+def coverage_matrix(cities, observations, radii, own):
+    """
+    share[j, k]: share of city k's listings (its own bucket, for a collected city) that a search at
+    city j returns. The observed URL overlap when both cities were collected, else the share of
+    k's scraped listing coordinates within j's radius, else the overlap of the two cities' discs
+    """
+    lats = np.array([city.latitude for city in cities])
+    lons = np.array([city.longitude for city in cities])
+    share = np.eye(len(cities))
+    for j, search in enumerate(cities):
+        distances = haversine_miles(search.latitude, search.longitude, lats, lons)
+        for k, observation in enumerate(observations):
+            if j == k:
+                continue
+            if observations[j] is not None and own[k]:
+                share[j, k] = len(observations[j].urls & own[k]) / len(own[k])
+            elif _has_points(observation):
+                listing_distances = haversine_miles(search.latitude, search.longitude,
+                                                    observation.lats, observation.lons)
+                share[j, k] = float((listing_distances <= radii[j]).mean())
+            else:
+                share[j, k] = disc_overlap(float(distances[k]), radii[j], radii[k])
+    return share
+
+
+def listing_estimates(cities, observations, own, share):
+    """
+    Expected unique listings of every city: its own bucket of URLs where it was collected, else
+    its population times the listings per resident of the collected cities, less the share the
+    collected searches already returned
+    """
+    collected = [i for i, observation in enumerate(observations) if observation is not None]
+    people = sum(cities[i].population for i in collected)
+    if people:
+        per_resident = sum(len(own[i]) for i in collected) / people
+    else:
+        per_resident = DEFAULT_LISTINGS_PER_RESIDENT
+    seen = np.prod(1 - share[collected], axis=0) if collected else np.ones(len(cities))
+    return np.array([
+        float(len(own[k])) if own[k] is not None else max(city.population * per_resident, 1.0) * seen[k]
+        for k, city in enumerate(cities)
+    ])
+
+
+# ---------------------- Planner -----------------------
+def search_costs(share, weights):
+    """Listings each city's search returns (new or not) and the search pages it takes to list them"""
+    results = share @ weights
+    return results, np.clip(np.ceil(results / RESULTS_PER_PAGE), 1, MAX_PAGES)
+
+
+class PlannedSearch(NamedTuple):
+    city: GazetteerCity
+    radius: float
+    est_results: float
+    est_pages: int
+    est_new: float
+    covers: tuple
+
+
+def plan_coverage(cities, share, weights, radii, covered_share=COVERED_SHARE, min_new_per_page=MIN_NEW_PER_PAGE):
+    """
+    Greedy weighted set cover: repeatedly add the search with the most expected new listings
+    per search page until every city is covered_share covered, or the best search left adds
+    fewer than min_new_per_page; yields the PlannedSearch of each
+    """
+    results, pages = search_costs(share, weights)
+    uncovered = np.ones(len(cities))
+    chosen = []
+    while True:
+        open_cities = uncovered > 1 - covered_share
+        if not open_cities.any():
+            break
+        gain = share @ (weights * uncovered)
+        gain[chosen] = -1
+        # A search only counts if it helps a city that isn't covered yet
+        useful = (share[:, open_cities] > 0).any(axis=1)
+        gain[~useful] = -1
+        j = int(np.argmax(gain / pages))
+        if gain[j] <= 0 or gain[j] / pages[j] < min_new_per_page:
+            break
+        chosen.append(j)
+        uncovered = uncovered * (1 - share[j])
+        covers = tuple(cities[k].city for k in np.flatnonzero(open_cities & (uncovered <= 1 - covered_share))
+                       if k != j)
+        yield PlannedSearch(cities[j], radii[j], float(results[j]), int(pages[j]), float(gain[j]), covers)
+
+
+def sweep_plan(state, search_term, gazetteer=GAZETTEER_FILE, covered_share=COVERED_SHARE,
+               min_new_per_page=MIN_NEW_PER_PAGE):
+    """Planned searches and the dropped cities for a state sweep, with the inputs they came from"""
+    cities = load_gazetteer(state, gazetteer)
+    if not cities:
+        return None
+    page_counts = search_page_counts(search_term)
+    observations = [observe_city(city, search_term, page_counts) for city in cities]
+    radii, default_radius = city_radii(cities, observations)
+    own = attribute_listings(observations)
+    share = coverage_matrix(cities, observations, radii, own)
+    weights = listing_estimates(cities, observations, own, share)
+    planned = list(plan_coverage(cities, share, weights, radii, covered_share, min_new_per_page))
+
+    # Each city left out, with the share of its listings the plan is expected to return
+    chosen = [cities.index(search.city) for search in planned]
+    dropped = {}
+    for k, city in enumerate(cities):
+        if k not in chosen:
+            j = max(chosen, key=lambda c: share[c, k]) if chosen else None
+            covered = 1 - float(np.prod(1 - share[chosen, k])) if chosen else 0.0
+            dropped[city.city] = (cities[j].city if j is not None else None, covered, float(weights[k]))
+    return {
+        'cities': cities, 'observations': observations, 'planned': planned, 'dropped': dropped,
+        'default_radius': default_radius, 'all_pages': int(search_costs(share, weights)[1].sum()),
+    }
+
+
+# ---------------------- Report -----------------------
+def actual_yield(planned, cities, observations):
+    """
+    Unique new URLs and search pages of the planned searches that were already collected,
+    in plan order: {city: (new unique URLs, pages fetched, pages counted from the archive)}
+    """
+    by_city = dict(zip((city.city for city in cities), observations))
+    seen = set()
+    actual = {}
+    for search in planned:
+        observation = by_city[search.city.city]
+        if observation is None:
+            continue
+        new = len(observation.urls - seen)
+        seen |= observation.urls
+        actual[search.city.city] = (new, observation.pages, observation.pages_archived)
+    return actual
+
+
+def print_report(plan, state, search_term):
+    cities, observations, planned = plan['cities'], plan['observations'], plan['planned']
+    actual = actual_yield(planned, cities, observations)
+    collected = [(city, observation) for city, observation in zip(cities, observations) if observation is not None]
+
+    print(f"Coverage plan for '{search_term}' in {state.upper()}: {len(planned)} searches "
+          f"instead of {len(cities)} cities (default radius {plan['default_radius']:.1f} mi)\n")
+    print(f"{'#':>3}  {'City':<20} {'Radius':>7} {'Est new':>8} {'Est pages':>9} {'Est/page':>8}   "
+          f"{'New':>6} {'Pages':>6} {'New/page':>8}  Covers")
+    for i, search in enumerate(planned, 1):
+        line = (f"{i:>3}  {search.city.city:<20} {search.radius:>5.1f}mi {search.est_new:>8.0f} "
+                f"{search.est_pages:>9} {search.est_new / search.est_pages:>8.1f}   ")
+        if search.city.city in actual:
+            new, pages, archived = actual[search.city.city]
+            line += f"{new:>6} {('' if archived else '~') + str(pages):>6} {new / pages:>8.1f}  "
+        else:
+            line += f"{'-':>6} {'-':>6} {'-':>8}  "
+        print(line + (", ".join(search.covers) or "-"))
+
+    est_new = sum(search.est_new for search in planned)
+    est_pages = sum(search.est_pages for search in planned)
+    print(f"\nEstimated: {est_new:.0f} unique listings in {est_pages} search pages "
+          f"({est_new / max(est_pages, 1):.1f} per page); searching every city takes about "
+          f"{plan['all_pages']} pages")
+    if collected:
+        unique = len(frozenset().union(*(observation.urls for _, observation in collected)))
+        pages = sum(observation.pages for _, observation in collected)
+        print(f"Actual so far: {unique} unique listings in {pages} search pages over {len(collected)} "
+              f"collected cities ({unique / max(pages, 1):.1f} per page)")
+        if actual:
+            new = sum(value[0] for value in actual.values())
+            planned_pages = sum(value[1] for value in actual.values())
+            print(f"  of which the planned searches: {new} unique listings in {planned_pages} pages "
+                  f"({new / max(planned_pages, 1):.1f} per page)")
+        print("  (~ page counts are estimated from URL counts; the rest come from the page archive)")
+
+    dropped = sorted(plan['dropped'].items(), key=lambda item: -item[1][1])
+    if dropped:
+        print(f"\nDropped {len(dropped)} cities (share of their listings the plan returns, mostly through):")
+        for city, (by, covered, listings) in dropped:
+            print(f"  {city:<20} {covered:>4.0%}  {by or '-':<20} ~{listings:.0f} listings")
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    # Same as `python -m cli plan`
+    import sys
+    from cli import main
+
+    main(['plan'] + sys.argv[1:])
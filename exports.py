@@ -0,0 +1,89 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+
+from manifest import load_manifest
+from providers import provider_name_candidates
+
+
+# ---------------------- Configuration -----------------------
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "yellowpages_exports")
+CHUNK_SIZE = 1024 * 1024
+
+
+# ---------------------- Utilities -----------------------
+def iter_file_chunks(filepath, chunk_size=CHUNK_SIZE):
+    """Yield the raw bytes of a file in fixed-size chunks"""
+    with open(filepath, mode='rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            yield chunk
+
+
+def matches_provider(filename, provider_type):
+    """
+    True if an output file belongs to provider_type (urls, data and failed files), under any of the
+    names providers.split_output_name recognizes (key, underscored key or search term)
+    """
+    return any(
+        filename.endswith(f"_{provider}{suffix}")
+        for provider in provider_name_candidates(provider_type)
+        for suffix in ('.csv', '_urls.csv', '_failed.csv', '_retry.csv', '_dead.csv', '_needs_selector.csv',
+                       '_delta.csv')
+    )
+
+
+def select_files(folder, provider_type=None, kinds=None):
+    """Output files of a state folder, optionally narrowed to one provider type and/or kinds"""
+    files = load_manifest(folder)
+    return {
+        name: entry for name, entry in sorted(files.items())
+        if (provider_type is None or matches_provider(name, provider_type))
+        and (kinds is None or entry['kind'] in kinds)
+    }
+
+
+# ---------------------- Bundles -----------------------
+def write_bundle(folder, filenames, fileobj):
+    """
+    Write a deflate-compressed zip of the given files to fileobj
+    Each file is copied in CHUNK_SIZE pieces, so memory use stays constant no matter
+    how large the folder is; fileobj may be unseekable (e.g. a socket or HTTP response)
+    """
+    with zipfile.ZipFile(fileobj, mode='w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        for filename in filenames:
+            arcname = f"{os.path.basename(os.path.normpath(folder))}/{filename}"
+            with bundle.open(arcname, mode='w', force_zip64=True) as dest:
+                for chunk in iter_file_chunks(os.path.join(folder, filename)):
+                    dest.write(chunk)
+
+
+def build_bundle_file(folder, provider_type=None):
+    """
+    Build (or reuse) a zip bundle of a state folder on disk and return its path
+    Bundles are named after a signature of the included files' size/mtime, so an
+    unchanged selection is served from the previous build
+    """
+    files = select_files(folder, provider_type)
+    if not files:
+        return None
+
+    signature = hashlib.sha1(repr([
+        (name, entry['size'], entry['mtime_ns']) for name, entry in files.items()
+    ]).encode('utf-8')).hexdigest()[:12]
+    state = os.path.basename(os.path.normpath(folder))
+    label = provider_type.replace(" ", "_").lower() if provider_type else "all"
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    bundle_path = os.path.join(EXPORT_DIR, f"{state}_{label}_{signature}.zip")
+
+    if not os.path.exists(bundle_path):
+        tmp_path = f"{bundle_path}.{os.getpid()}.tmp"
+        with open(tmp_path, mode='wb') as file:
+            write_bundle(folder, list(files), file)
+        os.replace(tmp_path, bundle_path)
+        # Drop bundles built from older versions of the same selection
+        for name in os.listdir(EXPORT_DIR):
+            if name.startswith(f"{state}_{label}_") and name.endswith('.zip') \
+                    and name != os.path.basename(bundle_path):
+                os.remove(os.path.join(EXPORT_DIR, name))
+    return bundle_path
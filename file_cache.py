@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+# ---------------------- Configuration -----------------------
+FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PAYLOAD_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+
+def file_key(path):
+    """Cache key for a file: changes whenever the file is rewritten or appended to"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class FileCache:
+    """
+    LRU cache of values derived from files, keyed on (path, mtime, size)
+    Entries are evicted least-recently-used first once max_bytes is exceeded
+    """
+
+    def __init__(self, max_bytes, sizeof=sys.getsizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, loader):
+        """Return loader(path), reusing the cached value while the file is unchanged"""
+        key = file_key(path)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+
+        value = loader(path)
+        size = self.sizeof(value)
+
+        with self.lock:
+            self.misses += 1
+            # Drop stale versions of the same file
+            for stale in [k for k in self.entries if k[0] == key[0]]:
+                self.current_bytes -= self.entries.pop(stale)[1]
+            if size <= self.max_bytes:
+                self.entries[key] = (value, size)
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self.entries.popitem(last=False)
+                    self.current_bytes -= evicted_size
+        return value
+
+    def peek(self, path):
+        """Return the cached value for path if it is cached and still fresh, else None"""
+        try:
+            key = file_key(path)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry[0] if entry else None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+
+def _frame_size(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _read_frame(path):
+    import pandas as pd
+    return pd.read_csv(path)
+
+
+def _read_raw(path):
+    with open(path, mode='rb') as file:
+        return file.read()
+
+
+frame_cache = FileCache(FRAME_CACHE_MAX_BYTES, sizeof=_frame_size)
+payload_cache = FileCache(PAYLOAD_CACHE_MAX_BYTES, sizeof=len)
+
+
+def load_csv(path):
+    """Load a CSV into a DataFrame, cached until the file changes"""
+    return frame_cache.get(path, _read_frame)
+
+
+def load_download_payload(path):
+    """
+    Original file bytes for a download button, cached until the file changes
+    The CSV is served as-is, never parsed and re-serialized
+    """
+    return payload_cache.get(path, _read_raw)
@@ -0,0 +1,261 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from metrics import get_metrics
+from records import BusinessData
+from url_sources import canonical_url
+
+
+# ---------------------- Configuration -----------------------
+INDEX_PATH = "listing_index.sqlite"
+
+# Indexed records younger than this are reused instead of refetching the page
+INDEX_MAX_AGE = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    url TEXT PRIMARY KEY,
+    phone TEXT,
+    record TEXT,
+    same_as TEXT,
+    fetched_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS listings_phone ON listings (phone);
+CREATE TABLE IF NOT EXISTS memberships (
+    url TEXT,
+    state TEXT,
+    city TEXT,
+    provider_type TEXT,
+    content_hash TEXT,
+    seen_at INTEGER,
+    seen_run TEXT,
+    PRIMARY KEY (url, state, city, provider_type)
+);
+CREATE INDEX IF NOT EXISTS memberships_output ON memberships (state, city, provider_type);
+CREATE TABLE IF NOT EXISTS phone_cross_refs (
+    url TEXT,
+    other_url TEXT,
+    PRIMARY KEY (url, other_url)
+);
+"""
+
+# Columns added after the first release of the index, for databases created before them
+MEMBERSHIP_COLUMNS = (('content_hash', 'TEXT'), ('seen_at', 'INTEGER'), ('seen_run', 'TEXT'))
+
+
+def phone_key(phone):
+    """Last 10 digits of a phone number, or None if it doesn't look like one"""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 10 else None
+
+
+def _norm(value):
+    return str(value).replace(" ", "_").lower()
+
+
+def match_key(value):
+    """Name / address compared between listings sharing a phone: lowercase letters and digits only"""
+    return re.sub(r'[^a-z0-9]', '', (value or '').lower()) or None
+
+
+def same_business(record, other):
+    """True if two records sharing a phone number also share their name or address"""
+    return any(
+        match_key(value) is not None and match_key(value) == match_key(other_value)
+        for value, other_value in ((record.username, other.username), (record.address, other.address))
+    )
+
+
+class ListingIndex:
+    """
+    Global index of extracted listings shared by every city/provider run
+    Keyed by canonical URL, with the phone number as a secondary key: a new URL whose
+    phone, and name or address, match a known listing is recorded as an alias of it. A phone
+    match alone (group practices, shared front desks) is only kept as a cross-reference.
+    Each listing also remembers which (state, city, provider type) outputs it has been written to.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(memberships)")}
+        if existing:
+            for name, sql_type in MEMBERSHIP_COLUMNS:
+                if name not in existing:
+                    self.conn.execute(f"ALTER TABLE memberships ADD COLUMN {name} {sql_type}")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def _find(self, url):
+        row = self.conn.execute(
+            "SELECT url, record, same_as, fetched_at FROM listings WHERE url = ?", (canonical_url(url),)
+        ).fetchone()
+        if row and row[2]:
+            row = self.conn.execute(
+                "SELECT url, record, same_as, fetched_at FROM listings WHERE url = ?", (row[2],)
+            ).fetchone()
+        return row
+
+    def resolve(self, url):
+        """Listing URL a known URL is filed under (following aliases), else None"""
+        with self.lock:
+            row = self._find(url)
+        return row[0] if row else None
+
+    def lookup(self, url, max_age=None, output=None):
+        """
+        Return (listing_url, record) for a known URL (following aliases), else None
+        With max_age, records fetched more than max_age seconds ago count as unknown. With
+        output=(state, city, provider_type), listings already written to that output count as
+        unknown too: recrawling an output has to fetch its pages to see whether they changed.
+        """
+        metrics = get_metrics()
+        metrics.incr('listing_index.lookups')
+        with self.lock:
+            row = self._find(url)
+            if row and output is not None:
+                state, city_name, provider_type = output
+                if self.conn.execute(
+                    "SELECT 1 FROM memberships WHERE url = ? AND state = ? AND city = ? AND provider_type = ?",
+                    (row[0], state.upper(), _norm(city_name), _norm(provider_type))
+                ).fetchone():
+                    metrics.incr('listing_index.recrawls')
+                    return None
+        if not row or (max_age is not None and row[3] < time.time() - max_age):
+            return None
+        metrics.incr('listing_index.url_hits')
+        return row[0], BusinessData(**json.loads(row[1]))
+
+    def add(self, url, record):
+        """
+        Store an extracted BusinessData record; returns the listing URL it is filed under, which is an
+        existing listing's URL when the phone number and the name or address match one already in the index
+        """
+        key = canonical_url(url)
+        phone = phone_key(record.phonenumber)
+        with self.lock:
+            existing = None
+            others = []
+            if phone:
+                candidates = self.conn.execute(
+                    "SELECT url, record FROM listings WHERE phone = ? AND same_as IS NULL AND url != ?", (phone, key)
+                ).fetchall()
+                for other_url, other_record in candidates:
+                    if same_business(record, BusinessData(**json.loads(other_record))):
+                        existing = (other_url,)
+                        break
+                    others.append(other_url)
+            if existing:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO listings (url, phone, record, same_as, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, phone, None, existing[0], int(time.time()))
+                )
+            else:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO listings (url, phone, record, same_as, fetched_at) VALUES (?, ?, ?, NULL, ?)",
+                    (key, phone, json.dumps(record._asdict()), int(time.time()))
+                )
+                # Different businesses behind one phone number: cross-reference them, both ways
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO phone_cross_refs (url, other_url) VALUES (?, ?)",
+                    [pair for other_url in others for pair in ((key, other_url), (other_url, key))]
+                )
+        if existing:
+            get_metrics().incr('listing_index.phone_matches')
+            return existing[0]
+        if others:
+            get_metrics().incr('listing_index.phone_cross_refs')
+        return key
+
+    def cross_references(self, url):
+        """Listing URLs of other businesses sharing a listing's phone number"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT other_url FROM phone_cross_refs WHERE url = ? ORDER BY other_url", (canonical_url(url),)
+            )]
+
+    def update_membership(self, listing_url, state, city_name, provider_type, content_hash, run=None):
+        """
+        Attach a city/provider membership with the content hash written there, seen in run
+        Returns the previously stored hash, or None if the listing is new to that output
+        """
+        params = (listing_url, state.upper(), _norm(city_name), _norm(provider_type))
+        with self.lock:
+            previous = self.conn.execute(
+                "SELECT content_hash FROM memberships WHERE url = ? AND state = ? AND city = ? AND provider_type = ?",
+                params
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO memberships (url, state, city, provider_type, content_hash, seen_at, seen_run) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                params + (content_hash, int(time.time()), run)
+            )
+        return previous[0] if previous else None
+
+    def mark_seen(self, listing_url, state, city_name, provider_type, run):
+        """Record that a run saw a listing of an output without re-extracting it"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE memberships SET seen_run = ? WHERE url = ? AND state = ? AND city = ? AND provider_type = ?",
+                (run, listing_url, state.upper(), _norm(city_name), _norm(provider_type))
+            )
+
+    def seen_in_run(self, listing_url, state, city_name, provider_type, run):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM memberships WHERE url = ? AND state = ? AND city = ? AND provider_type = ? "
+                "AND seen_run = ?",
+                (listing_url, state.upper(), _norm(city_name), _norm(provider_type), run)
+            ).fetchone() is not None
+
+    def membership_hashes(self, state, city_name, provider_type, unseen_in_run=None):
+        """
+        {listing_url: content_hash} of every listing written to a city/provider output
+        With unseen_in_run, only the listings that run didn't see (i.e. removed from the site)
+        """
+        sql = "SELECT url, content_hash FROM memberships WHERE state = ? AND city = ? AND provider_type = ?"
+        params = (state.upper(), _norm(city_name), _norm(provider_type))
+        if unseen_in_run is not None:
+            sql += " AND seen_run IS NOT ?"
+            params += (unseen_in_run,)
+        with self.lock:
+            return dict(self.conn.execute(sql, params))
+
+    def hashes_seen_in_run(self, state, city_name, provider_type, run, hashes):
+        """The content hashes among hashes still held by a listing of the output seen in run"""
+        with self.lock:
+            return {row_hash for row_hash in hashes if self.conn.execute(
+                "SELECT 1 FROM memberships WHERE state = ? AND city = ? AND provider_type = ? "
+                "AND seen_run = ? AND content_hash = ? LIMIT 1",
+                (state.upper(), _norm(city_name), _norm(provider_type), run, row_hash)
+            ).fetchone()}
+
+    def remove_memberships(self, listing_urls, state, city_name, provider_type):
+        with self.lock:
+            self.conn.executemany(
+                "DELETE FROM memberships WHERE url = ? AND state = ? AND city = ? AND provider_type = ?",
+                [(url, state.upper(), _norm(city_name), _norm(provider_type)) for url in listing_urls]
+            )
+
+    def memberships(self, url):
+        """(state, city, provider_type) tuples a listing has been written to"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT state, city, provider_type FROM memberships WHERE url = ?", (canonical_url(url),)
+            ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+_index = None
+
+
+def get_listing_index():
+    """Process-wide index, opened on first use"""
+    global _index
+    if _index is None:
+        _index = ListingIndex()
+    return _index
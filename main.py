@@ -1,176 +1,317 @@
-import requests
-import random
 import csv
+import json
 import os
 import time
 from urllib.parse import urljoin, urlencode
-from bs4 import BeautifulSoup
+from circuit_breaker import reset_run_health
+from clock import get_clock
+from manifest import record_write
+from metrics import get_metrics
+from page_archive import archive_response, get_page_archive
+from page_classifier import classify_response, INTERSTITIAL, NON_CONTENT_LABELS
+from transport import get_shared_session, establish_session, fetch, adaptive_timeout, uses_cloudscraper
+from url_sources import canonical_url, iter_csv_urls
 
-# Try to import cloudscraper for better anti-bot protection handling
-try:
-    import cloudscraper
-    CLOUDSCRAPER_AVAILABLE = True
-except ImportError:
-    CLOUDSCRAPER_AVAILABLE = False
+# Last completed search page of every unfinished collection in a state folder
+PROGRESS_FILENAME = "_collect_progress.json"
 
+# Search results are capped at this page
+MAX_PAGES = 99
 
-def urls_to_csv(urls, state, city_name, provider_type):
-    """Save URLs to CSV file"""
+SEARCH_URL = "https://www.yellowpages.com/search"
+
+
+def urls_output_path(state, city_name, provider_type):
     filename = f"{state}_{city_name}_{provider_type}_urls.csv".replace(" ", "_").lower()
-    folder = state.upper()
-    os.makedirs(folder, exist_ok=True)
-    filepath = os.path.join(folder, filename)
+    return os.path.join(state.upper(), filename)
+
+
+def urls_to_csv(urls, state, city_name, provider_type, known=None):
+    """
+    Append URLs to the URL CSV, skipping any already in it
+    known is the set of canonical URLs already in the file; it is read from the file when not
+    given and updated with the URLs written, so a caller flushing page by page reads it once.
+    Returns the URLs written.
+    """
+    filepath = urls_output_path(state, city_name, provider_type)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
     file_exists = os.path.isfile(filepath)
+    if known is None:
+        known = {canonical_url(url) for url in iter_csv_urls(filepath)} if file_exists else set()
+
+    new_urls = []
+    for url in urls:
+        key = canonical_url(url)
+        if key not in known:
+            known.add(key)
+            new_urls.append(url)
+    if not new_urls and file_exists:
+        return new_urls
 
+    size_before = os.path.getsize(filepath) if file_exists else 0
     with open(filepath, mode='a', newline='', encoding='utf-8') as file:
         writer = csv.writer(file)
         if not file_exists:
             writer.writerow(['Url'])
-        for url in urls:
+        for url in new_urls:
             writer.writerow([url])
+    record_write(filepath, len(new_urls), ['Url'], size_before=size_before)
+    return new_urls
+
+
+def _progress_path(state):
+    return os.path.join(state.upper(), PROGRESS_FILENAME)
+
+
+def _read_progress(state):
+    try:
+        with open(_progress_path(state), mode='r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _progress_key(search_term, state, city_name):
+    return f"{search_term.strip().lower()}|{city_name.strip().lower()}|{state.strip().lower()}"
+
+
+def load_progress(search_term, state, city_name):
+    """Last completed search page of an unfinished collection (0 if there is none)"""
+    entry = _read_progress(state).get(_progress_key(search_term, state, city_name))
+    return entry['last_page'] if entry else 0
+
+
+def save_progress(search_term, state, city_name, last_page):
+    """Record the last completed search page; last_page=None clears it (collection finished)"""
+    progress = _read_progress(state)
+    key = _progress_key(search_term, state, city_name)
+    if last_page is None:
+        if key not in progress:
+            return
+        del progress[key]
+    else:
+        progress[key] = {'last_page': last_page, 'updated_at': int(time.time())}
+    path = _progress_path(state)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode='w', encoding='utf-8') as file:
+        json.dump(progress, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def search_page_url(search_term, state, city_name, page_num):
+    """URL of one search results page"""
+    params = {
+        'search_terms': search_term,
+        'geo_location_terms': f"{city_name}, {state}"
+    }
+    
+    # Add page parameter if not first page
+    if page_num > 1:
+        params['page'] = page_num
+    
+    return f"{SEARCH_URL}?{urlencode(params)}"
+
+
+def find_result_cards(soup):
+    """Result cards of a parsed search page, trying several selectors"""
+    result_cards = []
+
+    # Try different class selectors
+    class_selectors = ['result', 'organic', 'srp-listing', 'business-card']
+    for class_name in class_selectors:
+        result_cards = soup.find_all('div', class_=class_name)
+        if result_cards:
+            print(f"Found {len(result_cards)} results using class: {class_name}")
+            break
+
+    # Try data-impression attribute
+    if not result_cards:
+        result_cards = soup.find_all('div', attrs={'data-impression': True})
+        if result_cards:
+            print(f"Found {len(result_cards)} results using data-impression attribute")
+
+    # Also try finding by business-name class
+    if not result_cards:
+        business_names = soup.find_all('a', class_='business-name')
+        if business_names:
+            # Get parent divs
+            result_cards = [name.find_parent('div', class_=lambda x: x and 'result' in x.lower()) 
+                           for name in business_names if name.find_parent('div')]
+            result_cards = [card for card in result_cards if card]
+            if result_cards:
+                print(f"Found {len(result_cards)} results using business-name links")
+    
+    return result_cards
+
+
+def extract_result_urls(result_cards):
+    """Absolute business URLs of the result cards, in page order and without duplicates"""
+    page_urls = []
+
+    # Extract URLs from each card
+    for card in result_cards:
+        try:
+            # Try different selectors for business name link
+            business_link = None
+
+            # Try finding business-name link
+            business_link = card.find('a', class_='business-name')
+            if not business_link:
+                business_link = card.find('a', href=lambda x: x and '/mip/' in x)
+            if not business_link:
+                business_link = card.find('h2', class_='business-name').find('a') if card.find('h2', class_='business-name') else None
+            if not business_link:
+                business_link = card.find('h3', class_='business-name').find('a') if card.find('h3', class_='business-name') else None
+            if not business_link:
+                # Try any link with business in class or href
+                business_link = card.find('a', class_=lambda x: x and 'business' in x.lower())
+            if not business_link:
+                # Try any link with data-business attribute
+                business_link = card.find('a', attrs={'data-business': True})
+
+            if business_link:
+                url = business_link.get('href')
+                if url:
+                    # Make sure URL is absolute
+                    if not url.startswith('http'):
+                        url = urljoin('https://www.yellowpages.com', url)
+                    if url and url not in page_urls:
+                        page_urls.append(url)
+        except Exception as e:
+            print(f"Error extracting URL from card: {str(e)}")
+    
+    return page_urls
+
+
+def has_next_page(soup):
+    """Whether a parsed search page links to an enabled next page"""
+    # Check for next page
+    has_next = False
+    next_selectors = [
+        ('a', {'aria-label': 'Next'}),
+        ('a', {'rel': 'next'}),
+        ('a', {'class': 'next'}),
+        ('a', {'class': 'next-page'}),
+    ]
+
+    for tag, attrs in next_selectors:
+        next_button = soup.find(tag, attrs)
+        if next_button:
+            # Check if button is disabled
+            disabled = next_button.get('disabled')
+            aria_disabled = next_button.get('aria-disabled')
+            classes = next_button.get('class', [])
+
+            if not disabled and aria_disabled != 'true' and 'disabled' not in classes:
+                has_next = True
+                break
+
+    # Also check pagination
+    if not has_next:
+        pagination = soup.find('div', class_='pagination')
+        if pagination:
+            next_link = pagination.find('a', class_=lambda x: x and 'next' in x and 'disabled' not in x)
+            if next_link:
+                has_next = True
+    
+    return has_next
 
 
 def random_delay(min_sec=2, max_sec=5):
     """Add random delay to mimic human behavior"""
-    time.sleep(random.uniform(min_sec, max_sec))
+    clock = get_clock()
+    clock.sleep(clock.uniform(min_sec, max_sec))
 
 
-def get_session(use_cloudscraper=True):
-    """
-    Create a requests session with proper headers
-    If cloudscraper is available and use_cloudscraper is True, use it to bypass anti-bot protection
-    """
-    if CLOUDSCRAPER_AVAILABLE and use_cloudscraper:
-        print("Using cloudscraper for better anti-bot protection...")
-        # cloudscraper automatically handles Cloudflare and other protections
-        # Use delay parameter to give it time to solve challenges
-        session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'desktop': True
-            },
-            delay=10  # Give cloudscraper time to solve challenges
-        )
-    else:
-        if use_cloudscraper and not CLOUDSCRAPER_AVAILABLE:
-            print("Note: cloudscraper not available. Install it with: pip install cloudscraper")
-            print("It helps bypass Cloudflare and other anti-bot protections.")
-            print("Continuing with standard requests library...")
-        session = requests.Session()
-        # Use a more recent and realistic User-Agent
-        user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
-        
-        session.headers.update({
-            'User-Agent': user_agent,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
-            'DNT': '1',
-        })
-    return session
-
-
-def scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=True):
+def point_to_page(url, response, what, debug_html_path):
+    """Tell where a page can be inspected: the page archive, or a debug HTML file without zstandard"""
+    if get_page_archive() is not None:
+        print(f"{what} archived, inspect with: python page_archive.py get \"{url}\"")
+        return
+    with open(debug_html_path, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    print(f"{what} saved to {debug_html_path} for inspection")
+
+
+def scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=True, session=None, resume=True):
     """
     Scrape YellowPages.com for business URLs
     
+    New URLs are appended to the URL CSV after every page, and the last completed page is
+    recorded, so an interrupted collection loses at most the page in flight.
+    
     Args:
         search_term: The search term (e.g., "dental care")
         state: State abbreviation (e.g., "WA")
         city_name: City name (e.g., "Aberdeen")
         use_cloudscraper: Whether to use cloudscraper if available (default: True)
+        session: Session to reuse (default: the shared transport session)
+        resume: Continue an unfinished collection after its last completed page (default: True)
     """
+    import requests
+    from bs4 import BeautifulSoup
+
+    reset_run_health()
     print("SCRAPING STARTED.....")
     print(f"Search Term: {search_term}")
     print(f"Location: {city_name}, {state}")
     
-    session = get_session(use_cloudscraper=use_cloudscraper)
+    if session is None:
+        session = get_shared_session(use_cloudscraper=use_cloudscraper)
     
     # First, establish session by visiting homepage
-    print("Establishing session by visiting homepage...")
-    try:
-        # Visit homepage first to get cookies and establish session
-        # Use longer timeout if using cloudscraper as it may need to solve challenges
-        timeout = 60 if (CLOUDSCRAPER_AVAILABLE and use_cloudscraper) else 30
-        response = session.get('https://www.yellowpages.com', timeout=timeout, allow_redirects=True)
-        print(f"Homepage response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            print("✓ Homepage loaded successfully")
-            # Wait a bit to mimic human behavior
-            random_delay(3, 5)
-        elif response.status_code == 403:
-            print("⚠ Got 403 on homepage")
-            if CLOUDSCRAPER_AVAILABLE and use_cloudscraper:
-                print("Even with cloudscraper, getting 403. The site may have very strong protection.")
-                print("You might need to use a proxy or browser automation (Playwright/Selenium)")
-            else:
-                print("Trying with different approach...")
-                # Try visiting a different page first
-                session.get('https://www.yellowpages.com/about', timeout=timeout)
-                random_delay(2, 4)
-        else:
-            print(f"Warning: Homepage returned status {response.status_code}")
-    except Exception as e:
-        print(f"Warning: Could not load homepage: {e}")
-        print("Continuing anyway...")
+    establish_session(session, use_cloudscraper=use_cloudscraper)
+    
+    # Create a safe provider type name from search term
+    provider_type = search_term.replace(" ", "_").lower()
+    filepath = urls_output_path(state, city_name, provider_type)
+    known_urls = {canonical_url(url) for url in iter_csv_urls(filepath)} if os.path.isfile(filepath) else set()
     
     all_urls = []
+    run_urls = set()
     page_num = 1
+    last_completed = load_progress(search_term, state, city_name) if resume else 0
+    if last_completed:
+        page_num = last_completed + 1
+        print(f"Resuming after page {last_completed} ({len(known_urls)} URLs already collected)")
+    finished = False
     consecutive_failures = 0
     max_failures = 3
     
     try:
-        while page_num < 100:
+        while page_num <= MAX_PAGES:
             print(f"Collecting URLs from Page: {page_num}")
             
-            # Construct search URL
-            base_url = "https://www.yellowpages.com/search"
-            params = {
-                'search_terms': search_term,
-                'geo_location_terms': f"{city_name}, {state}"
-            }
-            
-            # Add page parameter if not first page
-            if page_num > 1:
-                params['page'] = page_num
-            
-            search_url = f"{base_url}?{urlencode(params)}"
+            search_url = search_page_url(search_term, state, city_name, page_num)
             
             try:
                 print(f"Navigating to: {search_url}")
                 
                 # Update referer for subsequent requests (only if not using cloudscraper)
-                if not (CLOUDSCRAPER_AVAILABLE and use_cloudscraper):
+                if not uses_cloudscraper(use_cloudscraper):
                     session.headers.update({
                         'Referer': 'https://www.yellowpages.com/' if page_num == 1 else search_url
                     })
                 
                 # Use longer timeout if using cloudscraper
-                timeout = 60 if (CLOUDSCRAPER_AVAILABLE and use_cloudscraper) else 30
-                response = session.get(search_url, timeout=timeout, allow_redirects=True)
+                timeout = adaptive_timeout(use_cloudscraper)
+                response = fetch(session, search_url, timeout=timeout)
+                
+                # Label the raw bytes before any parsing, and keep them in the page archive
+                page_label = classify_response(response)
+                archive_response(search_url, response, page_label)
                 
                 # Check response status
                 if response.status_code == 403:
                     print(f"Got 403 Forbidden - site may be blocking requests")
                     print("Response headers:", dict(response.headers))
                     
-                    # Save the response HTML to see what Cloudflare is showing
-                    debug_html_path = f"debug_403_page_{page_num}.html"
-                    with open(debug_html_path, 'w', encoding='utf-8') as f:
-                        f.write(response.text)
-                    print(f"Saved 403 response to {debug_html_path} for inspection")
+                    # The response HTML shows what Cloudflare is showing
+                    point_to_page(search_url, response, "403 response", f"debug_403_page_{page_num}.html")
                     
                     # Check if it's a Cloudflare challenge
-                    if 'cloudflare' in response.text.lower() or 'challenge' in response.text.lower():
+                    if page_label == INTERSTITIAL:
                         print("Cloudflare challenge detected in response")
                         print("You need to install cloudscraper: pip install cloudscraper")
                         print("Or the site requires manual browser interaction")
@@ -178,8 +319,9 @@ def scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=True):
                     print("Trying with additional delay...")
                     random_delay(10, 15)
                     # Retry once with appropriate timeout
-                    timeout = 60 if (CLOUDSCRAPER_AVAILABLE and use_cloudscraper) else 30
-                    response = session.get(search_url, timeout=timeout, allow_redirects=True)
+                    response = fetch(session, search_url, timeout=timeout)
+                    page_label = classify_response(response)
+                    archive_response(search_url, response, page_label)
                 
                 if response.status_code >= 400:
                     print(f"Got error status code: {response.status_code}")
@@ -197,54 +339,36 @@ def scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=True):
                     random_delay(5, 8)
                     continue
                 
-                # Parse HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
                 # Check if we got a Cloudflare challenge page
-                page_content = response.text.lower()
-                if 'challenge-platform' in page_content or 'just a moment' in page_content:
+                if page_label == INTERSTITIAL:
                     print("Cloudflare challenge detected, waiting...")
                     random_delay(10, 15)
                     # Retry the request
-                    response = session.get(search_url, timeout=30)
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Try multiple selectors for results
-                result_cards = []
+                    response = fetch(session, search_url, timeout=timeout)
+                    page_label = classify_response(response)
+                    archive_response(search_url, response, page_label)
                 
-                # Try different class selectors
-                class_selectors = ['result', 'organic', 'srp-listing', 'business-card']
-                for class_name in class_selectors:
-                    result_cards = soup.find_all('div', class_=class_name)
-                    if result_cards:
-                        print(f"Found {len(result_cards)} results using class: {class_name}")
+                # Only real content pages reach the parser
+                if page_label in NON_CONTENT_LABELS:
+                    print(f"Got {page_label} page instead of search results")
+                    consecutive_failures += 1
+                    if consecutive_failures >= max_failures:
+                        print("Too many unusable pages, stopping")
                         break
+                    page_num += 1
+                    random_delay(3, 5)
+                    continue
                 
-                # Try data-impression attribute
-                if not result_cards:
-                    result_cards = soup.find_all('div', attrs={'data-impression': True})
-                    if result_cards:
-                        print(f"Found {len(result_cards)} results using data-impression attribute")
+                # Parse HTML
+                soup = BeautifulSoup(response.content, 'html.parser')
                 
-                # Also try finding by business-name class
-                if not result_cards:
-                    business_names = soup.find_all('a', class_='business-name')
-                    if business_names:
-                        # Get parent divs
-                        result_cards = [name.find_parent('div', class_=lambda x: x and 'result' in x.lower()) 
-                                       for name in business_names if name.find_parent('div')]
-                        result_cards = [card for card in result_cards if card]
-                        if result_cards:
-                            print(f"Found {len(result_cards)} results using business-name links")
+                result_cards = find_result_cards(soup)
                 
                 if not result_cards:
                     print("No result cards found with any selector")
                     
-                    # Save HTML content for inspection
-                    html_path = f"debug_page_{page_num}.html"
-                    with open(html_path, 'w', encoding='utf-8') as f:
-                        f.write(response.text)
-                    print(f"HTML saved to {html_path}")
+                    # Keep the HTML content for inspection
+                    point_to_page(search_url, response, "HTML", f"debug_page_{page_num}.html")
                     print(f"Page title: {soup.title.string if soup.title else 'N/A'}")
                     print(f"Current URL: {search_url}")
                     
@@ -256,43 +380,24 @@ def scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=True):
                     random_delay(3, 5)
                     continue
                 
-                page_urls_before = len(all_urls)
+                page_urls = extract_result_urls(result_cards)
                 
-                # Extract URLs from each card
-                for card in result_cards:
-                    try:
-                        # Try different selectors for business name link
-                        business_link = None
-                        
-                        # Try finding business-name link
-                        business_link = card.find('a', class_='business-name')
-                        if not business_link:
-                            business_link = card.find('a', href=lambda x: x and '/mip/' in x)
-                        if not business_link:
-                            business_link = card.find('h2', class_='business-name').find('a') if card.find('h2', class_='business-name') else None
-                        if not business_link:
-                            business_link = card.find('h3', class_='business-name').find('a') if card.find('h3', class_='business-name') else None
-                        if not business_link:
-                            # Try any link with business in class or href
-                            business_link = card.find('a', class_=lambda x: x and 'business' in x.lower())
-                        if not business_link:
-                            # Try any link with data-business attribute
-                            business_link = card.find('a', attrs={'data-business': True})
-                        
-                        if business_link:
-                            url = business_link.get('href')
-                            if url:
-                                # Make sure URL is absolute
-                                if not url.startswith('http'):
-                                    url = urljoin('https://www.yellowpages.com', url)
-                                if url and url not in all_urls:
-                                    all_urls.append(url)
-                                    print(f"  Found URL: {url}")
-                    except Exception as e:
-                        print(f"Error extracting URL from card: {str(e)}")
+                # Flush the page's new URLs before moving on
+                new_urls = urls_to_csv(page_urls, state, city_name, provider_type, known=known_urls)
+                for url in new_urls:
+                    print(f"  Found URL: {url}")
+                all_urls.extend(new_urls)
+                # URLs not seen earlier in this run (a recrawl finds mostly URLs already in the file)
+                page_keys = {canonical_url(url) for url in page_urls} - run_urls
+                run_urls |= page_keys
+                page_urls_collected = len(page_keys)
+                print(f"Collected {page_urls_collected} URLs from page {page_num} ({len(new_urls)} new). "
+                      f"Total: {len(run_urls)}")
                 
-                page_urls_collected = len(all_urls) - page_urls_before
-                print(f"Collected {page_urls_collected} URLs from page {page_num}. Total: {len(all_urls)}")
+                # Only a run of completed pages moves the resume point (a skipped page is retried)
+                if page_num == last_completed + 1:
+                    last_completed = page_num
+                    save_progress(search_term, state, city_name, last_completed)
                 
                 if page_urls_collected == 0:
                     consecutive_failures += 1
@@ -302,37 +407,11 @@ def scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=True):
                 else:
                     consecutive_failures = 0
                 
-                # Check for next page
-                has_next = False
-                next_selectors = [
-                    ('a', {'aria-label': 'Next'}),
-                    ('a', {'rel': 'next'}),
-                    ('a', {'class': 'next'}),
-                    ('a', {'class': 'next-page'}),
-                ]
-                
-                for tag, attrs in next_selectors:
-                    next_button = soup.find(tag, attrs)
-                    if next_button:
-                        # Check if button is disabled
-                        disabled = next_button.get('disabled')
-                        aria_disabled = next_button.get('aria-disabled')
-                        classes = next_button.get('class', [])
-                        
-                        if not disabled and aria_disabled != 'true' and 'disabled' not in classes:
-                            has_next = True
-                            break
-                
-                # Also check pagination
-                if not has_next:
-                    pagination = soup.find('div', class_='pagination')
-                    if pagination:
-                        next_link = pagination.find('a', class_=lambda x: x and 'next' in x and 'disabled' not in x)
-                        if next_link:
-                            has_next = True
+                has_next = has_next_page(soup)
                 
                 if not has_next:
                     print("Reached last page - no next button available")
+                    finished = True
                     break
                 
                 page_num += 1
@@ -357,24 +436,27 @@ def scrape_yellow_pages(search_term, state, city_name, use_cloudscraper=True):
                 random_delay(5, 8)
                 continue
     
+        else:
+            finished = True
+    
     except Exception as e:
         print(f"Error during URL collection: {str(e)}")
     
-    print(f"Total URLs collected: {len(all_urls)}")
-    all_urls = list(set(all_urls))
-    print(f"Unique URLs after deduplication: {len(all_urls)}")
+    if finished:
+        # The next run is a fresh pass over all pages; URLs already in the file are skipped
+        save_progress(search_term, state, city_name, None)
+    elif last_completed:
+        print(f"Collection stopped early; the next run resumes after page {last_completed}")
     
-    if all_urls:
-        # Create a safe provider type name from search term
-        provider_type = search_term.replace(" ", "_").lower()
-        urls_to_csv(all_urls, state, city_name, provider_type)
+    print(f"Total URLs collected: {len(run_urls)}, new: {len(all_urls)} (written to {filepath})")
     
+    print(get_metrics().summary())
     print("SCRAPING COMPLETED!")
 
 
 if __name__ == "__main__":
-    # Example usage:
-    # scrape_yellow_pages("dental care", "WA", "Aberdeen")
-    
-    # You can modify these parameters or pass them as command-line arguments
-    scrape_yellow_pages("dental care", "WA", "Aberdeen")
+    # Same as `python -m cli collect`: python main.py ["search term"] [--state WA] [--city Aberdeen]
+    import sys
+    from cli import main
+
+    main(['collect'] + sys.argv[1:])
@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+import threading
+
+
+# ---------------------- Configuration -----------------------
+MANIFEST_FILENAME = "_manifest.json"
+
+_lock = threading.Lock()
+
+
+# ---------------------- Utilities -----------------------
+def file_kind(filename):
+    """Classify an output CSV by its name: urls, failed, retry, dead, needs_selector, delta or data"""
+    if filename.endswith('_urls.csv'):
+        return 'urls'
+    if filename.endswith('_failed.csv'):
+        return 'failed'
+    if filename.endswith('_retry.csv'):
+        return 'retry'
+    if filename.endswith('_dead.csv'):
+        return 'dead'
+    if filename.endswith('_needs_selector.csv'):
+        return 'needs_selector'
+    if filename.endswith('_delta.csv'):
+        return 'delta'
+    return 'data'
+
+
+def list_state_folders(root='.'):
+    """Two-letter uppercase folders holding scraper output"""
+    return sorted(
+        entry.name for entry in os.scandir(root)
+        if entry.is_dir() and len(entry.name) == 2 and entry.name.isupper()
+    )
+
+
+def manifest_path(folder):
+    return os.path.join(folder, MANIFEST_FILENAME)
+
+
+def _read_manifest(folder):
+    try:
+        with open(manifest_path(folder), mode='r', encoding='utf-8') as file:
+            manifest = json.load(file)
+        return manifest.get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(folder, files):
+    path = manifest_path(folder)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode='w', encoding='utf-8') as file:
+        json.dump({'version': 1, 'files': files}, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _is_fresh(entry, stat):
+    return entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+
+
+def scan_file(filepath):
+    """
+    Build a manifest entry by scanning the file itself
+    Rows are counted with the csv module, so quoted fields spanning several
+    lines count once; blank lines aren't rows
+    """
+    stat = os.stat(filepath)
+    with open(filepath, mode='r', newline='', encoding='utf-8', errors='replace') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        rows = sum(1 for row in reader if row)
+    return {
+        'kind': file_kind(os.path.basename(filepath)),
+        'rows': rows,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'columns': header,
+    }
+
+
+# ---------------------- Writer Hooks -----------------------
+def record_write(filepath, rows_added, columns, size_before=0, replaced=False):
+    """
+    Update the state manifest after a writer touched filepath
+    size_before is the file size before rows_added rows were appended; when it
+    doesn't match the manifest (another writer got there first) the file is rescanned.
+    replaced=True means the file was rewritten and now holds exactly rows_added rows.
+    """
+    folder, filename = os.path.split(filepath)
+    folder = folder or '.'
+    with _lock:
+        files = _read_manifest(folder)
+        entry = files.get(filename)
+        if replaced or size_before == 0:
+            rows = rows_added
+        elif entry is not None and entry.get('size') == size_before:
+            rows = entry['rows'] + rows_added
+        else:
+            rows = None
+
+        if rows is None:
+            entry = scan_file(filepath)
+        else:
+            stat = os.stat(filepath)
+            entry = {
+                'kind': file_kind(filename),
+                'rows': rows,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'columns': list(columns),
+            }
+        files[filename] = entry
+        _write_manifest(folder, files)
+
+
+# ---------------------- Readers -----------------------
+def load_manifest(folder):
+    """
+    Return {filename: entry} for every CSV in a state folder
+    Entries whose size/mtime no longer match the file on disk are rescanned,
+    new files are added and deleted files dropped; the manifest is rewritten
+    only if something changed
+    """
+    with _lock:
+        files = _read_manifest(folder)
+        changed = False
+        current = {}
+        for entry in os.scandir(folder):
+            if not entry.is_file() or not entry.name.endswith('.csv'):
+                continue
+            cached = files.get(entry.name)
+            if cached is not None and _is_fresh(cached, entry.stat()):
+                current[entry.name] = cached
+            else:
+                current[entry.name] = scan_file(entry.path)
+                changed = True
+        if changed or set(current) != set(files):
+            _write_manifest(folder, current)
+        return current
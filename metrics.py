@@ -0,0 +1,83 @@
+import threading
+from collections import Counter
+
+
+class RunMetrics:
+    """
+    Counters collected during a scraping run
+    Transfer sizes are tracked both as bytes on the wire (compressed body) and
+    decoded bytes, per content encoding
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.elapsed = 0.0
+        self.status_codes = Counter()
+        self.encodings = Counter()
+        self.counters = Counter()
+
+    def record_request(self, status_code, wire_bytes, decoded_bytes, encoding=None, elapsed=0.0):
+        with self.lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+            self.elapsed += elapsed
+            self.status_codes[status_code] += 1
+            self.encodings[encoding or 'identity'] += 1
+
+    def incr(self, name, amount=1):
+        """Bump a named counter, e.g. incr('page_label.interstitial')"""
+        with self.lock:
+            self.counters[name] += amount
+
+    def summary(self):
+        """Human-readable multi-line summary, printed at the end of a run"""
+        with self.lock:
+            lines = [
+                f"Requests: {self.requests}",
+                f"Bytes on the wire: {self.wire_bytes / 1024:.1f} KB, "
+                f"decoded: {self.decoded_bytes / 1024:.1f} KB"
+                + (f" (ratio {self.decoded_bytes / self.wire_bytes:.1f}x)" if self.wire_bytes else ""),
+                f"Status codes: {dict(self.status_codes)}",
+                f"Encodings: {dict(self.encodings)}",
+            ]
+            if self.counters['streaming.pages']:
+                lines.append(
+                    f"Streamed pages cut off early: {self.counters['streaming.cut_off']}"
+                    f"/{self.counters['streaming.pages']} "
+                    f"({100 * self.counters['streaming.cut_off'] / self.counters['streaming.pages']:.1f}%)"
+                )
+            if self.counters['listing_index.lookups']:
+                hits = self.counters['listing_index.url_hits']
+                lookups = self.counters['listing_index.lookups']
+                lines.append(f"Listing index hits: {hits}/{lookups} ({100 * hits / lookups:.1f}% fetches saved)")
+            if self.counters['archive.stored_bytes']:
+                raw = self.counters['archive.raw_bytes']
+                stored = self.counters['archive.stored_bytes']
+                lines.append(f"Pages archived: {raw / 1024:.1f} KB stored in {stored / 1024:.1f} KB "
+                             f"(ratio {raw / stored:.1f}x)")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name}: {value}")
+            return "\n".join(lines)
+
+
+_metrics = RunMetrics()
+
+
+def get_metrics():
+    """Return the metrics object the current run reports into"""
+    return _metrics
+
+
+def set_metrics(metrics):
+    """Install a new metrics object and return the previous one"""
+    global _metrics
+    previous = _metrics
+    _metrics = metrics
+    return previous
@@ -0,0 +1,190 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from manifest import load_manifest
+
+# pyarrow is optional: with it string columns run on Arrow compute kernels and output is
+# Parquet; without it the same code runs on Python strings and writes CSV
+try:
+    import pyarrow
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+# ---------------------- Configuration -----------------------
+NORMALIZED_DIR = "normalized"
+
+MISSING = ('', 'N/A')
+
+# "<street><city>, ST 12345[-6789]": the scraped address has no separator between street and city
+ADDRESS_PATTERN = r'^(?P<rest>.*?),\s*(?P<state>[A-Z]{2})\s+(?P<zip>\d{5})(?:-\d{4})?\s*$'
+# Fallback split at the last place where the street runs straight into a capitalized city name
+# (a directional suffix like "Ave S" can run into it too)
+STREET_CITY_PATTERN = r'^(?P<street>.*(?:[a-z0-9.)]|\s[NSEW]{1,2}))(?P<city>[A-Z][a-z][^,]*)$'
+# NANP: area code and exchange don't start with 0 or 1
+NANP_PATTERN = r'^[2-9]\d{2}[2-9]\d{6}$'
+
+
+# ---------------------- Utilities -----------------------
+STRING_DTYPE = pd.ArrowDtype(pyarrow.string()) if ARROW_AVAILABLE else object
+
+
+def _strings(series):
+    """Series as strings with missing values as '' (Arrow-backed when pyarrow is installed)"""
+    strings = series.fillna('').astype(str)
+    if ARROW_AVAILABLE:
+        # One contiguous Arrow array: concatenated frames otherwise keep a chunk per source
+        array = pyarrow.array(strings, type=pyarrow.string())
+        return pd.Series(pd.arrays.ArrowExtensionArray(array), index=series.index)
+    return strings.astype(object)
+
+
+def _flags(mask):
+    """Plain NumPy bool array of a (possibly nullable) boolean Series"""
+    return mask.fillna(False).to_numpy(dtype=bool)
+
+
+# ---------------------- Column Normalizers -----------------------
+def normalize_phones(phones):
+    """
+    E.164 form (+1XXXXXXXXXX) of US phone numbers, NA where the number isn't valid
+    Returns (e164, valid) Series
+    """
+    digits = _strings(phones).str.replace(r'\D+', '', regex=True)
+    length = digits.str.len().to_numpy()
+    national = digits.where(length == 10, digits.str[1:].where((length == 11) & _flags(digits.str.startswith('1')), ''))
+    valid = pd.Series(_flags(national.str.match(NANP_PATTERN)), index=phones.index)
+    e164 = ('+1' + national).where(valid, None)
+    return e164, valid
+
+
+def split_addresses(addresses, cities):
+    """
+    Split scraped addresses into Street, Address City, Address State and Zip
+    The city is cut off the end of the street using the row's search city when the address
+    ends with it (one vectorized comparison per distinct city name length), else at the last
+    lowercase-to-capital boundary
+    """
+    addresses = _strings(addresses).str.strip()
+    parts = addresses.str.extract(ADDRESS_PATTERN)
+    rest = _strings(parts['rest']).str.strip()
+
+    rest_lower = rest.str.lower()
+    rest_length = rest.str.len().to_numpy()
+    city_lower = _strings(cities).str.replace('_', ' ').str.strip().str.lower()
+    city_length = city_lower.str.len().to_numpy()
+
+    street = pd.Series(None, index=addresses.index, dtype=STRING_DTYPE)
+    city = pd.Series(None, index=addresses.index, dtype=STRING_DTYPE)
+    matched_any = np.zeros(len(rest), dtype=bool)
+    for length in np.unique(city_length[city_length > 0]):
+        matched = (city_length == length) & (rest_length > length)
+        matched &= _flags(rest_lower.str[-length:] == city_lower)
+        street = street.where(~matched, rest.str[:-length])
+        city = city.where(~matched, rest.str[-length:])
+        matched_any |= matched
+
+    unmatched = ~matched_any & (rest_length > 0)
+    if unmatched.any():
+        fallback = rest[unmatched].str.extract(STREET_CITY_PATTERN)
+        street[unmatched] = fallback['street'].astype(STRING_DTYPE)
+        city[unmatched] = fallback['city'].astype(STRING_DTYPE)
+
+    return pd.DataFrame({
+        'Street': street.str.strip().str.rstrip(','),
+        'Address City': city.str.strip(),
+        'Address State': parts['state'],
+        'Zip': parts['zip'],
+    }, index=addresses.index)
+
+
+def coerce_coordinates(latitudes, longitudes):
+    """Numeric latitude/longitude (NaN for 'N/A' and junk) and a validity mask"""
+    lat = pd.to_numeric(latitudes.replace(list(MISSING), None), errors='coerce').astype('float64')
+    lon = pd.to_numeric(longitudes.replace(list(MISSING), None), errors='coerce').astype('float64')
+    lat_values = lat.to_numpy()
+    lon_values = lon.to_numpy()
+    with np.errstate(invalid='ignore'):
+        valid = (
+            (np.abs(lat_values) <= 90) & (np.abs(lon_values) <= 180)
+            & ~((lat_values == 0) & (lon_values == 0))
+        )
+    return lat, lon, pd.Series(valid, index=lat.index)
+
+
+def normalize_frame(df):
+    """
+    Column-wise normalization of a data table (DATA_COLUMNS layout)
+    Adds Phone E164, Street, Address City, Address State, Zip and Valid Phone / Valid Address /
+    Valid Coordinates flags; Latitude and Longitude become floats
+    """
+    df = df.copy()
+    df['Phone E164'], df['Valid Phone'] = normalize_phones(df['Phone Number'])
+    address = split_addresses(df['Address'], df['City'])
+    for column in address.columns:
+        df[column] = address[column]
+    df['Valid Address'] = _flags(address['Zip'].notna() & address['Street'].fillna('').ne(''))
+    df['Latitude'], df['Longitude'], df['Valid Coordinates'] = coerce_coordinates(df['Latitude'], df['Longitude'])
+    return df
+
+
+# ---------------------- State Datasets -----------------------
+def load_state_frame(state, root='.'):
+    """All data CSVs of a state folder as one string-typed DataFrame"""
+    folder = os.path.join(root, state.upper())
+    paths = [
+        os.path.join(folder, filename)
+        for filename, entry in sorted(load_manifest(folder).items())
+        if entry['kind'] == 'data' and entry['rows'] > 0
+    ]
+    if not paths:
+        return pd.DataFrame()
+    frames = [pd.read_csv(path, dtype=str, keep_default_na=False) for path in paths]
+    return pd.concat(frames, ignore_index=True)
+
+
+def normalize_state(state, root='.', output_format=None):
+    """
+    Normalize every scraped row of a state and write normalized/[state].parquet (or .csv
+    without pyarrow); returns the output path, or None if the state has no data
+    """
+    start = time.perf_counter()
+    df = load_state_frame(state, root)
+    if df.empty:
+        print(f"No data files found for {state.upper()}")
+        return None
+    loaded = time.perf_counter()
+    normalized = normalize_frame(df)
+    elapsed = time.perf_counter() - loaded
+
+    output_format = output_format or ('parquet' if ARROW_AVAILABLE else 'csv')
+    os.makedirs(os.path.join(root, NORMALIZED_DIR), exist_ok=True)
+    filepath = os.path.join(root, NORMALIZED_DIR, f"{state.lower()}.{output_format}")
+    if output_format == 'parquet':
+        normalized.to_parquet(filepath, index=False)
+    else:
+        normalized.to_csv(filepath, index=False)
+
+    print(f"✓ Normalized {len(df)} rows of {state.upper()} in {elapsed:.2f}s "
+          f"(loaded in {loaded - start:.2f}s): {filepath}")
+    for flag in ('Valid Phone', 'Valid Address', 'Valid Coordinates'):
+        print(f"  {flag}: {int(normalized[flag].sum())}/{len(normalized)}")
+    return filepath
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Normalize phones, addresses and coordinates of scraped data")
+    parser.add_argument('states', nargs='+', help="State folders to normalize, e.g. WA GA")
+    parser.add_argument('--format', choices=('parquet', 'csv'), default=None,
+                        help="Output format (default: parquet if pyarrow is installed)")
+    args = parser.parse_args()
+
+    for state in args.states:
+        normalize_state(state, output_format=args.format)
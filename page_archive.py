@@ -0,0 +1,284 @@
+import glob
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import get_metrics
+from url_sources import canonical_url
+
+# zstandard is optional: without it pages are not archived
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+# ---------------------- Configuration -----------------------
+ARCHIVE_DIR = "page_archive"
+INDEX_FILENAME = "index.sqlite"
+
+# A segment file is closed and a new one started past this size
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+COMPRESSION_LEVEL = 9
+
+# The dictionary is trained once this many pages were stored without one
+TRAIN_SAMPLES = 100
+DICT_SIZE = 112 * 1024
+# Template markup sits at the top of the page; the rest is mostly listing content
+SAMPLE_BYTES = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT,
+    fetched_at REAL,
+    status INTEGER,
+    label TEXT,
+    truncated INTEGER,
+    segment TEXT,
+    offset INTEGER,
+    length INTEGER,
+    raw_size INTEGER,
+    dict_id INTEGER,
+    PRIMARY KEY (url, fetched_at)
+);
+"""
+
+
+class PageArchive:
+    """
+    Append-only archive of raw fetched pages
+    Every page is its own zstd frame (compressed with a dictionary trained on archived pages
+    once there are enough of them), appended to a segment file. The SQLite index maps
+    (canonical URL, fetch time) to segment, offset and length, so any page is read back with
+    one index lookup and one seek. Each archive instance writes its own segments, so several
+    scraper processes can share the directory.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, INDEX_FILENAME), timeout=30,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.segment_prefix = f"seg-{int(time.time())}-{os.getpid()}"
+        self.segment_num = 0
+        self.segment_path = None
+        self.dictionaries = {}
+        self.decompressors = {}
+        self._load_dictionaries()
+        self._use_dictionary(max(self.dictionaries) if self.dictionaries else 0)
+        self.pages_without_dict = self.conn.execute(
+            "SELECT COUNT(*) FROM pages WHERE dict_id = 0"
+        ).fetchone()[0]
+
+    def _load_dictionaries(self):
+        for path in glob.glob(os.path.join(self.root, "dict-*.zdict")):
+            with open(path, mode='rb') as file:
+                dictionary = zstandard.ZstdCompressionDict(file.read())
+            self.dictionaries.setdefault(dictionary.dict_id(), dictionary)
+
+    def _use_dictionary(self, dict_id):
+        self.dict_id = dict_id
+        if dict_id:
+            self.compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=self.dictionaries[dict_id])
+        else:
+            self.compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+
+    def _decompressor(self, dict_id):
+        if dict_id not in self.decompressors:
+            if dict_id and dict_id not in self.dictionaries:
+                # Trained by another process sharing the directory after this one started
+                self._load_dictionaries()
+                if dict_id not in self.dictionaries:
+                    raise ValueError(f"Page compressed with dictionary {dict_id}, which is missing from {self.root}")
+            if dict_id:
+                self.decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self.dictionaries[dict_id])
+            else:
+                self.decompressors[dict_id] = zstandard.ZstdDecompressor()
+        return self.decompressors[dict_id]
+
+    def _segment_for(self, length):
+        """Current segment of this instance, rolling over to a new one when it's full"""
+        if (self.segment_path is None
+                or os.path.getsize(self.segment_path) + length > SEGMENT_MAX_BYTES):
+            self.segment_num += 1
+            self.segment_path = os.path.join(self.root, f"{self.segment_prefix}-{self.segment_num:04d}.zst")
+            open(self.segment_path, mode='ab').close()
+        return self.segment_path
+
+    def put(self, url, content, status_code=200, label=None, truncated=False, fetched_at=None):
+        """Archive the raw bytes of a fetched page; returns the fetch time it is keyed by"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        content = content or b''
+        with self.lock:
+            frame = self.compressor.compress(content)
+            segment = self._segment_for(len(frame))
+            with open(segment, mode='ab') as file:
+                offset = file.tell()
+                file.write(frame)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (canonical_url(url), fetched_at, status_code, label, int(bool(truncated)),
+                 os.path.basename(segment), offset, len(frame), len(content), self.dict_id)
+            )
+            if not self.dict_id:
+                self.pages_without_dict += 1
+        metrics = get_metrics()
+        metrics.incr('archive.pages')
+        metrics.incr('archive.raw_bytes', len(content))
+        metrics.incr('archive.stored_bytes', len(frame))
+        if not self.dict_id and self.pages_without_dict >= TRAIN_SAMPLES:
+            self.train_dictionary()
+        return fetched_at
+
+    def get(self, url, fetched_at=None):
+        """Raw bytes of the page fetched at fetched_at (default: the latest fetch), or None"""
+        with self.lock:
+            if fetched_at is None:
+                row = self.conn.execute(
+                    "SELECT segment, offset, length, dict_id FROM pages WHERE url = ? "
+                    "ORDER BY fetched_at DESC LIMIT 1", (canonical_url(url),)
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    "SELECT segment, offset, length, dict_id FROM pages WHERE url = ? AND fetched_at = ?",
+                    (canonical_url(url), fetched_at)
+                ).fetchone()
+        if not row:
+            return None
+        segment, offset, length, dict_id = row
+        with open(os.path.join(self.root, segment), mode='rb') as file:
+            file.seek(offset)
+            frame = file.read(length)
+        return self._decompressor(dict_id).decompress(frame)
+
+    def history(self, url):
+        """(fetched_at, status, label, truncated) of every archived fetch of a URL, oldest first"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT fetched_at, status, label, truncated FROM pages WHERE url = ? ORDER BY fetched_at",
+                (canonical_url(url),)
+            ).fetchall()
+
+    def fetches(self, url_prefix):
+        """(url, fetched_at, status, label) of every archived fetch whose canonical URL starts with url_prefix"""
+        pattern = url_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        with self.lock:
+            return self.conn.execute(
+                "SELECT url, fetched_at, status, label FROM pages WHERE url LIKE ? ESCAPE '\\' ORDER BY fetched_at",
+                (pattern,)
+            ).fetchall()
+
+    def iter_pages(self, label=None):
+        """Yield (url, fetched_at, content) for every archived page, optionally of one label"""
+        with self.lock:
+            if label is None:
+                keys = self.conn.execute("SELECT url, fetched_at FROM pages ORDER BY fetched_at").fetchall()
+            else:
+                keys = self.conn.execute(
+                    "SELECT url, fetched_at FROM pages WHERE label = ? ORDER BY fetched_at", (label,)
+                ).fetchall()
+        for url, fetched_at in keys:
+            yield url, fetched_at, self.get(url, fetched_at)
+
+    def train_dictionary(self, sample_count=TRAIN_SAMPLES * 4):
+        """
+        Train a zstd dictionary on the most recent archived pages and compress new pages with it
+        Pages already archived keep the dictionary they were written with
+        """
+        with self.lock:
+            keys = self.conn.execute(
+                "SELECT url, fetched_at FROM pages ORDER BY fetched_at DESC LIMIT ?", (sample_count,)
+            ).fetchall()
+        samples = [self.get(url, fetched_at)[:SAMPLE_BYTES] for url, fetched_at in keys]
+        try:
+            dictionary = zstandard.train_dictionary(DICT_SIZE, [s for s in samples if s])
+        except zstandard.ZstdError as e:
+            print(f"⚠ Could not train archive dictionary: {e}")
+            # Try again once another batch of pages is in
+            self.pages_without_dict = 0
+            return None
+        dict_id = dictionary.dict_id()
+        # Written under a temporary name so other processes never load a partial dictionary
+        path = os.path.join(self.root, f"dict-{dict_id}.zdict")
+        with open(f"{path}.tmp", mode='wb') as file:
+            file.write(dictionary.as_bytes())
+        os.replace(f"{path}.tmp", path)
+        with self.lock:
+            self.dictionaries[dict_id] = dictionary
+            self._use_dictionary(dict_id)
+        print(f"✓ Trained archive dictionary {dict_id} on {len(samples)} pages")
+        return dict_id
+
+    def stats(self):
+        """Page count, raw and stored bytes of the whole archive"""
+        with self.lock:
+            pages, raw, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(length), 0) FROM pages"
+            ).fetchone()
+        return {'pages': pages, 'raw_bytes': raw, 'stored_bytes': stored, 'dictionaries': len(self.dictionaries)}
+
+    def close(self):
+        self.conn.close()
+
+
+_archive = None
+
+
+def get_page_archive():
+    """Process-wide archive, opened on first use; None when zstandard isn't installed"""
+    global _archive
+    if _archive is None and ZSTD_AVAILABLE:
+        _archive = PageArchive()
+    return _archive
+
+
+def archive_response(url, response, label=None):
+    """Archive a fetched response if the archive is available"""
+    archive = get_page_archive()
+    if archive is None:
+        return None
+    return archive.put(url, response.content, response.status_code, label,
+                       truncated=getattr(response, 'truncated', False))
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Inspect the raw page archive")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    get_parser = subparsers.add_parser('get', help="Write an archived page to stdout")
+    get_parser.add_argument('url')
+    get_parser.add_argument('--at', type=float, help="Fetch time (default: latest)")
+    history_parser = subparsers.add_parser('history', help="List the archived fetches of a URL")
+    history_parser.add_argument('url')
+    subparsers.add_parser('stats', help="Archive size and compression ratio")
+    subparsers.add_parser('train', help="Retrain the dictionary on recent pages")
+    args = parser.parse_args()
+
+    if not ZSTD_AVAILABLE:
+        sys.exit("The page archive needs zstandard: pip install zstandard")
+    archive = get_page_archive()
+    if args.command == 'get':
+        content = archive.get(args.url, args.at)
+        if content is None:
+            sys.exit(f"Not archived: {args.url}")
+        sys.stdout.buffer.write(content)
+    elif args.command == 'history':
+        for fetched_at, status, label, truncated in archive.history(args.url):
+            print(f"{fetched_at:.3f}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(fetched_at))}  "
+                  f"{status}  {label or '-'}" + ("  (truncated)" if truncated else ""))
+    elif args.command == 'stats':
+        stats = archive.stats()
+        ratio = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+        print(f"Pages: {stats['pages']}, raw: {stats['raw_bytes'] / 1024 / 1024:.1f} MB, "
+              f"stored: {stats['stored_bytes'] / 1024 / 1024:.1f} MB (ratio {ratio:.1f}x), "
+              f"dictionaries: {stats['dictionaries']}")
+    elif args.command == 'train':
+        archive.train_dictionary()
@@ -0,0 +1,75 @@
+import re
+
+from metrics import get_metrics
+
+
+# ---------------------- Labels -----------------------
+LISTING = 'listing'
+SEARCH = 'search'
+INTERSTITIAL = 'interstitial'
+ERROR = 'error'
+EMPTY = 'empty'
+UNKNOWN = 'unknown'
+
+# Labels that are never worth handing to the HTML parser
+NON_CONTENT_LABELS = (INTERSTITIAL, ERROR, EMPTY)
+
+
+# ---------------------- Configuration -----------------------
+# Only this many leading bytes are scanned; markers past it fall back to UNKNOWN
+PREFIX_BYTES = 256 * 1024
+
+# Case-insensitive byte patterns: matched in place, without a lowered copy of the page
+NON_WHITESPACE = re.compile(rb'\S')
+# Only found on the challenge page itself: its title, the challenge form and options
+INTERSTITIAL_MARKERS = re.compile(
+    rb'<title>\s*(?:just a moment\.\.\.|attention required! \| cloudflare)|cf-browser-verification'
+    rb'|id="challenge-form"|_cf_chl_opt',
+    re.IGNORECASE
+)
+# Cloudflare also injects its challenge-platform beacon script into ordinary pages, so these
+# only mark a challenge on the statuses Cloudflare serves challenges with
+WEAK_INTERSTITIAL_MARKERS = re.compile(rb'challenge-platform|cf-chl-', re.IGNORECASE)
+CHALLENGE_STATUSES = (403, 429, 503)
+ERROR_MARKERS = re.compile(
+    rb'<title>[^<]*(?:page not found|404 not found|error)[^<]*</title>|something went wrong',
+    re.IGNORECASE
+)
+LISTING_MARKERS = re.compile(
+    rb'class="[^"]*\bsales-info\b|id="default-ctas"',
+    re.IGNORECASE
+)
+SEARCH_MARKERS = re.compile(
+    rb'class="[^"]*\b(?:search-results|srp-listing|organic)\b|data-impression=',
+    re.IGNORECASE
+)
+
+
+def classify_page(content, status_code=200, prefix_bytes=PREFIX_BYTES):
+    """
+    Label a raw response body before any parsing:
+    listing / search / interstitial / error / empty, or unknown if no marker matched
+    """
+    end = min(len(content or b''), prefix_bytes)
+    if not end or not NON_WHITESPACE.search(content, 0, end):
+        return EMPTY
+    if INTERSTITIAL_MARKERS.search(content, 0, end):
+        return INTERSTITIAL
+    if status_code in CHALLENGE_STATUSES and WEAK_INTERSTITIAL_MARKERS.search(content, 0, end):
+        return INTERSTITIAL
+    if status_code >= 400:
+        return ERROR
+    if LISTING_MARKERS.search(content, 0, end):
+        return LISTING
+    if SEARCH_MARKERS.search(content, 0, end):
+        return SEARCH
+    if ERROR_MARKERS.search(content, 0, end):
+        return ERROR
+    return UNKNOWN
+
+
+def classify_response(response):
+    """Classify a response's raw bytes and record the label in the run metrics"""
+    label = classify_page(response.content, response.status_code)
+    get_metrics().incr(f'page_label.{label}')
+    return label
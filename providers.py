@@ -0,0 +1,48 @@
+# Provider types mapping (key: filename format, value: search term)
+PROVIDER_TYPES = {
+    'diagnostic-center': 'medical diagnostic center',
+    'imaging-labs': 'medical imaging labs',
+    'primary-care': 'primary care',
+    'dental-care': 'dental care',
+    'urgent-care': 'urgent care',
+    'vision-care': 'medical vision care',
+    'chiropractics': 'chiropractics',
+    'physiotherapy': 'physiotherapy'
+}
+
+
+def name_candidates(key):
+    """Forms a provider type takes in output file names: the key, underscored, or its search term"""
+    return (key, key.replace('-', '_'), PROVIDER_TYPES[key].replace(' ', '_'))
+
+
+def provider_name_candidates(provider_type):
+    """
+    Every output-name form of a provider type given as a key, a search term or a file name part
+    (e.g. 'vision-care', 'medical vision care'); an unknown type only matches itself
+    """
+    provider = provider_type.replace(" ", "_").lower()
+    for key in PROVIDER_TYPES:
+        candidates = name_candidates(key)
+        if provider in candidates or provider.replace('-', '_') in candidates:
+            return candidates
+    return (provider,)
+
+
+def split_output_name(filename, state, suffix=''):
+    """
+    Recover (city, provider_type) from an output file name such as
+    wa_aberdeen_dental-care_failed.csv, using the known provider keys
+    (hyphenated or underscored) to tell where the city ends
+    Returns None if the name doesn't match any provider type
+    """
+    prefix = f"{state.lower()}_"
+    ending = f"_{suffix}.csv" if suffix else ".csv"
+    if not filename.startswith(prefix) or not filename.endswith(ending):
+        return None
+    middle = filename[len(prefix):-len(ending)]
+    for key in PROVIDER_TYPES:
+        for candidate in name_candidates(key):
+            if middle.endswith(f"_{candidate}"):
+                return middle[:-len(candidate) - 1], candidate
+    return None
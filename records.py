@@ -0,0 +1,176 @@
+import csv
+import importlib.util
+import io
+import json
+from typing import NamedTuple
+
+# pyarrow is optional: without it the Parquet serializer is unavailable. It is only imported
+# by write_parquet, so the scrapers don't pay its import time
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+
+# ---------------------- Columns -----------------------
+DATA_COLUMNS = [
+    'Username', 'Email', 'Phone Number', 'Password',
+    'Address', 'Latitude', 'Longitude',
+    'Provider Type', 'Provider Name',
+    'State', 'City'
+]
+
+FAILED_COLUMNS = ['Url', 'Reason', 'Attempts', 'Failed At', 'State', 'City', 'Provider Type']
+
+
+# ---------------------- Records -----------------------
+class BusinessData(NamedTuple):
+    """Fields extracted from one detail page (None where a field wasn't found)"""
+    username: str = None
+    phonenumber: str = None
+    address: str = None
+    latitude: str = None
+    longitude: str = None
+
+
+class ListingRecord(NamedTuple):
+    """One row of a data CSV, in DATA_COLUMNS order"""
+    username: str
+    email: str
+    phone_number: str
+    password: str
+    address: str
+    latitude: str
+    longitude: str
+    provider_type: str
+    provider_name: str
+    state: str
+    city: str
+
+    @classmethod
+    def from_business(cls, data, provider_type, state, city_name):
+        """Data row for an extracted listing"""
+        # Generate email and password from username
+        username_parts = data.username.split()
+        email = "".join(username_parts) + "@gmail.com" if username_parts else "default@gmail.com"
+        password1 = username_parts[0] + "@123" if username_parts else "default@123"
+
+        return cls(
+            data.username,
+            email,
+            data.phonenumber or 'N/A',
+            password1,
+            data.address or 'N/A',
+            'N/A' if data.latitude is None else str(data.latitude),
+            'N/A' if data.longitude is None else str(data.longitude),
+            provider_type,
+            data.username,
+            state,
+            city_name
+        )
+
+
+class FailedUrl(NamedTuple):
+    """One row of a failed / retry / dead-letter CSV, in FAILED_COLUMNS order"""
+    url: str
+    reason: str
+    attempts: int
+    failed_at: int
+    state: str
+    city: str
+    provider_type: str
+
+
+# ---------------------- Serializers -----------------------
+def write_csv(records, file, columns=DATA_COLUMNS, header=True):
+    """Write a batch of records to an open text file as CSV rows; returns the row count"""
+    writer = csv.writer(file)
+    if header:
+        writer.writerow(columns)
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def write_jsonl(records, file, columns=DATA_COLUMNS):
+    """Write a batch of records to an open text file as one JSON object per line"""
+    count = 0
+    for record in records:
+        file.write(json.dumps(dict(zip(columns, record)), ensure_ascii=False))
+        file.write("\n")
+        count += 1
+    return count
+
+
+def write_parquet(records, file, columns=DATA_COLUMNS):
+    """Write a batch of records as a Parquet table of string columns (needs pyarrow)"""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("pyarrow is not installed. Install it with: pip install pyarrow")
+    import pyarrow
+    import pyarrow.parquet
+
+    values = list(zip(*records)) or [()] * len(columns)
+    arrays = [
+        pyarrow.array([None if v is None else str(v) for v in column], type=pyarrow.string())
+        for column in values
+    ]
+    pyarrow.parquet.write_table(pyarrow.Table.from_arrays(arrays, names=list(columns)), file)
+    return len(values[0])
+
+
+def read_records(filepath, record_type=ListingRecord):
+    """Lazily read a CSV written by write_csv back into records"""
+    with open(filepath, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        width = len(record_type._fields)
+        for row in reader:
+            yield record_type(*(row + [''] * (width - len(row)))[:width])
+
+
+def serialize_file(filepath, fmt):
+    """Bytes of a data CSV converted to 'jsonl' or 'parquet', for downloads"""
+    if fmt == 'jsonl':
+        buffer = io.StringIO()
+        write_jsonl(read_records(filepath), buffer)
+        return buffer.getvalue().encode('utf-8')
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        write_parquet(list(read_records(filepath)), buffer)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+# ---------------------- Memory -----------------------
+def measure_buffers(count=100_000):
+    """
+    Bytes held by count buffered listings as dicts / lists (the old layout) vs records
+    Field strings are built up front and shared, so only the containers are measured
+    """
+    import tracemalloc
+
+    fields = [(f"Business {i}", f"(360) 555-{i % 10000:04d}", f"{i} Main St", "46.97", "-123.81")
+              for i in range(count)]
+
+    def measure(build):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        items = build()
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del items
+        return used
+
+    keys = BusinessData._fields
+    return {
+        'extracted dict': measure(lambda: [dict(zip(keys, f)) for f in fields]),
+        'BusinessData': measure(lambda: [BusinessData(*f) for f in fields]),
+        'failure list': measure(lambda: [[f[0], "HTTP 403", 3, 0, "WA", "Aberdeen", "dental"] for f in fields]),
+        'FailedUrl': measure(lambda: [FailedUrl(f[0], "HTTP 403", 3, 0, "WA", "Aberdeen", "dental") for f in fields]),
+    }
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    count = 100_000
+    for name, used in measure_buffers(count).items():
+        print(f"{name:>15}: {used / 1024 / 1024:6.1f} MB per {count} buffered ({used / count:.0f} bytes each)")
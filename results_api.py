@@ -0,0 +1,333 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from file_cache import file_key
+from manifest import list_state_folders, load_manifest
+from records import ListingRecord, read_records
+
+
+# ---------------------- Configuration -----------------------
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# The output tree is re-checked (manifest + stat, no CSV reads) at most this often
+REFRESH_INTERVAL = 2.0
+
+FIELDS = ListingRecord._fields
+
+
+# ---------------------- Utilities -----------------------
+def _norm(value):
+    """Lookup form of a state / city / provider type: 'Dental-Care', 'dental care' -> 'dental_care'"""
+    return re.sub(r'[\s_-]+', '_', (value or '').strip().lower())
+
+
+def group_key(record):
+    """(state, city, provider type) a listing is served under"""
+    return _norm(record.state), _norm(record.city), _norm(record.provider_type)
+
+
+def encode_cursor(key, position):
+    raw = json.dumps([*key, position], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(group key, position) of a cursor; ValueError if it is malformed"""
+    try:
+        state, city, provider_type, position = json.loads(
+            base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        )
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not (isinstance(position, int) and position >= 0
+            and all(isinstance(part, str) for part in (state, city, provider_type))):
+        raise ValueError("Invalid cursor")
+    return (state, city, provider_type), position
+
+
+# ---------------------- Index -----------------------
+class Snapshot:
+    """Immutable view of the indexed output tree; requests read one snapshot start to end"""
+
+    def __init__(self, groups, versions):
+        self.groups = groups
+        self.versions = versions
+        self.keys = sorted(groups)
+        self.rows = sum(len(records) for records in groups.values())
+
+    def select(self, state=None, city=None, provider_type=None):
+        """Sorted group keys matching the filters"""
+        wanted = (_norm(state) if state else None, _norm(city) if city else None,
+                  _norm(provider_type) if provider_type else None)
+        if wanted[0]:
+            # Keys are sorted, so one state is a contiguous run
+            start = bisect_left(self.keys, (wanted[0],))
+            keys = []
+            for key in self.keys[start:]:
+                if key[0] != wanted[0]:
+                    break
+                keys.append(key)
+        else:
+            keys = self.keys
+        return [key for key in keys
+                if (not wanted[1] or key[1] == wanted[1]) and (not wanted[2] or key[2] == wanted[2])]
+
+    def etag(self, keys, *parts):
+        """Strong ETag over the versions of the given groups and the request parts"""
+        digest = hashlib.blake2b(digest_size=12)
+        for part in parts:
+            digest.update(repr(part).encode('utf-8'))
+        for key in keys:
+            digest.update(self.versions[key].encode('ascii'))
+        return f'"{digest.hexdigest()}"'
+
+
+class ResultsIndex:
+    """
+    In-memory index of every scraped data file, grouped by (state, city, provider type)
+    refresh() only re-reads files that are new or changed since the last call (by mtime and
+    size) and swaps in a new Snapshot, so readers never see a half-built index and never
+    wait on CSV parsing done for another request.
+    """
+
+    def __init__(self, root='.', refresh_interval=REFRESH_INTERVAL):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.files = {}
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.checked_at = 0.0
+        self.snapshot = Snapshot({}, {})
+        self.refresh()
+
+    def refresh(self):
+        """Pick up new, changed and deleted data files; returns the number of files (re)read"""
+        current = {}
+        for state in list_state_folders(self.root):
+            folder = os.path.join(self.root, state)
+            for filename, entry in load_manifest(folder).items():
+                if entry['kind'] == 'data' and entry['rows'] > 0:
+                    path = os.path.join(folder, filename)
+                    current[path] = file_key(path)
+
+        with self.lock:
+            self.checked_at = time.monotonic()
+            changed = [path for path, key in current.items()
+                       if path not in self.files or self.files[path][0] != key]
+            if not changed and current.keys() == self.files.keys():
+                return 0
+            for path in changed:
+                self.files[path] = (current[path], list(read_records(path)))
+            for path in set(self.files) - set(current):
+                del self.files[path]
+            self.snapshot = self._build()
+        return len(changed)
+
+    def _build(self):
+        groups = {}
+        file_keys = {}
+        for path in sorted(self.files):
+            key, records = self.files[path]
+            for record in records:
+                group = group_key(record)
+                groups.setdefault(group, []).append(record)
+                file_keys.setdefault(group, set()).add(key)
+        versions = {
+            group: hashlib.blake2b(repr(sorted(keys)).encode('utf-8'), digest_size=8).hexdigest()
+            for group, keys in file_keys.items()
+        }
+        return Snapshot({group: tuple(records) for group, records in groups.items()}, versions)
+
+    def current(self):
+        """
+        Latest snapshot, refreshing first if the tree wasn't checked recently
+        Only one caller does the refresh; concurrent callers get the snapshot as it is
+        """
+        if (time.monotonic() - self.checked_at >= self.refresh_interval
+                and self.refresh_lock.acquire(blocking=False)):
+            try:
+                self.refresh()
+            finally:
+                self.refresh_lock.release()
+        return self.snapshot
+
+
+# ---------------------- Queries -----------------------
+def parse_fields(value):
+    """Projected ListingRecord fields of a fields= parameter (all fields when empty)"""
+    if not value:
+        return FIELDS
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(FIELDS)})")
+    return fields
+
+
+def query_listings(snapshot, state=None, city=None, provider_type=None, cursor=None,
+                   limit=DEFAULT_LIMIT, fields=FIELDS):
+    """
+    One page of listings in (state, city, provider type, file order) order
+    Returns (items, next_cursor, keys in scope); the cursor names the group and position
+    to continue at, so it stays valid while files are appended to
+    """
+    keys = snapshot.select(state, city, provider_type)
+    start_index, position = 0, 0
+    if cursor:
+        cursor_key, position = decode_cursor(cursor)
+        start_index = bisect_left(keys, tuple(cursor_key))
+        if start_index < len(keys) and keys[start_index] != tuple(cursor_key):
+            # The cursor's group is gone: continue with the next one
+            position = 0
+
+    indices = [FIELDS.index(field) for field in fields]
+    items = []
+    for i in range(start_index, len(keys)):
+        records = snapshot.groups[keys[i]]
+        end = position + limit - len(items)
+        for record in records[position:end]:
+            items.append({field: record[index] for field, index in zip(fields, indices)})
+        if len(items) >= limit:
+            if end < len(records):
+                return items, encode_cursor(keys[i], end), keys
+            if i + 1 < len(keys):
+                return items, encode_cursor(keys[i + 1], 0), keys
+            return items, None, keys
+        position = 0
+    return items, None, keys
+
+
+# ---------------------- HTTP -----------------------
+class ResultsHandler(BaseHTTPRequestHandler):
+    """
+    Read-only JSON API over a ResultsIndex
+      GET /listings?state=&city=&provider_type=&fields=a,b&limit=&cursor=
+      GET /outputs   (state / city / provider type groups and their row counts)
+      GET /healthz
+    Every 200 carries an ETag; a matching If-None-Match gets an empty 304.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "YellowPagesResults/1.0"
+    # Headers and body go out in one buffered write (flushed after each request) with Nagle
+    # off; separate small writes on a keep-alive connection stall on delayed ACKs (~40 ms)
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        snapshot = self.server.index.current()
+        try:
+            if url.path == '/listings':
+                status, etag, payload = self._listings(snapshot, params)
+            elif url.path == '/outputs':
+                status, etag, payload = self._outputs(snapshot, params)
+            elif url.path == '/healthz':
+                status, etag = 200, None
+                payload = {'status': 'ok', 'files': len(self.server.index.files), 'rows': snapshot.rows}
+            else:
+                status, etag, payload = 404, None, {'error': f"Not found: {url.path}"}
+        except ValueError as e:
+            status, etag, payload = 400, None, {'error': str(e)}
+
+        if etag and status == 200 and etag in self._if_none_match():
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _if_none_match(self):
+        header = self.headers.get('If-None-Match', '')
+        return {tag.strip().removeprefix('W/') for tag in header.split(',') if tag.strip()}
+
+    def _listings(self, snapshot, params):
+        try:
+            limit = int(params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+        fields = parse_fields(params.get('fields'))
+        filters = {name: params.get(name) for name in ('state', 'city', 'provider_type')}
+        items, next_cursor, keys = query_listings(snapshot, cursor=params.get('cursor'), limit=limit,
+                                                  fields=fields, **filters)
+        etag = snapshot.etag(keys, sorted(params.items()))
+        return 200, etag, {'items': items, 'count': len(items), 'next_cursor': next_cursor}
+
+    def _outputs(self, snapshot, params):
+        keys = snapshot.select(params.get('state'), params.get('city'), params.get('provider_type'))
+        outputs = [
+            {'state': state, 'city': city, 'provider_type': provider_type,
+             'rows': len(snapshot.groups[(state, city, provider_type)])}
+            for state, city, provider_type in keys
+        ]
+        return 200, snapshot.etag(keys, 'outputs', sorted(params.items())), {'outputs': outputs}
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ResultsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, index, verbose=False):
+        super().__init__(address, ResultsHandler)
+        self.index = index
+        self.verbose = verbose
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, root='.', verbose=False):
+    """Index the output tree and serve it until interrupted"""
+    start = time.perf_counter()
+    index = ResultsIndex(root)
+    print(f"✓ Indexed {index.snapshot.rows} listings from {len(index.files)} files "
+          f"in {time.perf_counter() - start:.2f}s")
+    server = ResultsServer((host, port), index, verbose=verbose)
+    print(f"Serving results on http://{host}:{server.server_address[1]}/listings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping results server")
+    finally:
+        server.server_close()
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    # Same as `python -m cli serve`
+    import sys
+    from cli import main
+
+    main(['serve'] + sys.argv[1:])
@@ -0,0 +1,133 @@
+import os
+import threading
+
+from manifest import list_state_folders, load_manifest
+
+# DuckDB is optional: without it the query page is simply not offered
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+
+# ---------------------- Configuration -----------------------
+VIEW_NAME = "listings"
+
+
+# ---------------------- Utilities -----------------------
+def data_files(root='.'):
+    """Paths of every scraped data file (CSV or Parquet) across all state folders"""
+    paths = []
+    for state in list_state_folders(root):
+        folder = os.path.join(root, state)
+        for filename, entry in load_manifest(folder).items():
+            if entry['kind'] == 'data' and entry['rows'] > 0:
+                paths.append(os.path.join(folder, filename))
+        paths.extend(
+            os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.endswith('.parquet')
+        )
+    return paths
+
+
+def _sql_list(values):
+    """SQL list literal of strings; views can't take bound parameters, so quotes are escaped here"""
+    return "[" + ", ".join("'" + value.replace("'", "''") + "'" for value in values) + "]"
+
+
+def _where_clause(state=None, city=None, provider_type=None, name_contains=None):
+    conditions = []
+    params = []
+    if state:
+        conditions.append('upper("State") = ?')
+        params.append(state.upper())
+    if city:
+        conditions.append('lower("City") = ?')
+        params.append(city.lower())
+    if provider_type:
+        conditions.append('"Provider Type" = ?')
+        params.append(provider_type)
+    if name_contains:
+        conditions.append('"Provider Name" ILIKE ?')
+        params.append(f"%{name_contains}%")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+class ResultsQuery:
+    """
+    DuckDB view over every scraped data file in the output tree
+    Filters, counts and pagination run inside DuckDB, so only the requested page of
+    rows is ever materialized as a DataFrame
+    """
+
+    def __init__(self, root='.'):
+        if not DUCKDB_AVAILABLE:
+            raise RuntimeError("duckdb is not installed. Install it with: pip install duckdb")
+        self.root = root
+        self.conn = duckdb.connect(database=':memory:')
+        self.lock = threading.Lock()
+        self.files = None
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the view if data files were added or removed since the last call"""
+        files = data_files(self.root)
+        if files == self.files:
+            return
+        with self.lock:
+            self.files = files
+            csv_files = [f for f in files if f.endswith('.csv')]
+            parquet_files = [f for f in files if f.endswith('.parquet')]
+            sources = []
+            if csv_files:
+                sources.append(
+                    f"SELECT * FROM read_csv({_sql_list(csv_files)}, header=true, all_varchar=true, union_by_name=true)"
+                )
+            if parquet_files:
+                sources.append(f"SELECT * FROM read_parquet({_sql_list(parquet_files)}, union_by_name=true)")
+            if not sources:
+                sources.append(
+                    'SELECT NULL::VARCHAR AS "Provider Name", NULL::VARCHAR AS "Provider Type", '
+                    'NULL::VARCHAR AS "State", NULL::VARCHAR AS "City" WHERE false'
+                )
+            self.conn.execute(
+                f"CREATE OR REPLACE VIEW {VIEW_NAME} AS {' UNION ALL BY NAME '.join(sources)}"
+            )
+
+    def count(self, **filters):
+        """Number of listings matching the filters"""
+        where, params = _where_clause(**filters)
+        with self.lock:
+            return self.conn.execute(f"SELECT count(*) FROM {VIEW_NAME}{where}", params).fetchone()[0]
+
+    def page(self, page_num=1, page_size=50, **filters):
+        """One page (1-based) of matching listings as a DataFrame"""
+        where, params = _where_clause(**filters)
+        offset = max(page_num - 1, 0) * page_size
+        sql = (
+            f'SELECT * FROM {VIEW_NAME}{where} '
+            f'ORDER BY "State", "City", "Provider Type", "Provider Name" '
+            f'LIMIT {int(page_size)} OFFSET {int(offset)}'
+        )
+        with self.lock:
+            return self.conn.execute(sql, params).df()
+
+    def aggregate(self, group_by=('State', 'Provider Type'), **filters):
+        """Listing counts grouped by the given columns"""
+        where, params = _where_clause(**filters)
+        columns = ", ".join(f'"{column}"' for column in group_by)
+        sql = (
+            f"SELECT {columns}, count(*) AS listings FROM {VIEW_NAME}{where} "
+            f"GROUP BY {columns} ORDER BY listings DESC"
+        )
+        with self.lock:
+            return self.conn.execute(sql, params).df()
+
+    def distinct(self, column, **filters):
+        """Sorted distinct values of a column, e.g. the cities available in a state"""
+        where, params = _where_clause(**filters)
+        sql = f'SELECT DISTINCT "{column}" FROM {VIEW_NAME}{where} ORDER BY 1'
+        with self.lock:
+            return [row[0] for row in self.conn.execute(sql, params).fetchall() if row[0] is not None]
@@ -0,0 +1,159 @@
+import csv
+import os
+import time
+
+from manifest import load_manifest
+from providers import split_output_name
+from records import FailedUrl
+from scrape_urls import scrape_url, save_url_list, append_url_rows
+from transport import get_shared_session, establish_session
+
+
+# ---------------------- Configuration -----------------------
+# Total attempts (across all runs) before a URL goes to the dead-letter file
+MAX_ATTEMPTS = 9
+
+# Backoff before a failed URL is eligible again: RETRY_BASE_DELAY * 2 ** (attempt rounds - 1)
+RETRY_BASE_DELAY = 15 * 60
+RETRY_MAX_DELAY = 24 * 60 * 60
+ATTEMPTS_PER_ROUND = 3
+
+
+# ---------------------- Utilities -----------------------
+def _norm(value):
+    return str(value).replace(" ", "_").lower()
+
+
+def backoff_delay(attempts):
+    """Seconds a URL waits after its last failure; doubles with every failed round of attempts"""
+    rounds = max((attempts + ATTEMPTS_PER_ROUND - 1) // ATTEMPTS_PER_ROUND, 1)
+    return min(RETRY_BASE_DELAY * 2 ** (rounds - 1), RETRY_MAX_DELAY)
+
+
+def is_due(row, now=None):
+    """True once a FailedUrl's backoff has elapsed"""
+    now = time.time() if now is None else now
+    return not row.failed_at or now >= int(row.failed_at) + backoff_delay(int(row.attempts))
+
+
+def load_failures(state, city_name=None, provider_type=None, include_retry_queue=True):
+    """
+    Read failure rows from the failed (and retry-queue) CSVs of a state folder
+    Returns {(city, provider_type): {url: (FailedUrl, source_kind)}}.
+    Files written before reasons/attempts were recorded are accepted too: their city and
+    provider type come from the file name and they count as one failed round.
+    """
+    folder = state.upper()
+    if not os.path.isdir(folder):
+        return {}
+
+    kinds = ('failed', 'retry') if include_retry_queue else ('failed',)
+    groups = {}
+    for filename, entry in load_manifest(folder).items():
+        if entry['kind'] not in kinds:
+            continue
+        parsed = split_output_name(filename, state, entry['kind'])
+        with open(os.path.join(folder, filename), mode='r', newline='', encoding='utf-8') as file:
+            for record in csv.DictReader(file):
+                url = record.get('Url') or next(iter(record.values()), None)
+                city = record.get('City') or (parsed[0] if parsed else None)
+                key = record.get('Provider Type') or (parsed[1] if parsed else None)
+                if not url or not city or not key:
+                    print(f"⚠ Skipping row without city/provider type in {filename}: {url}")
+                    continue
+                if city_name and _norm(city) != _norm(city_name):
+                    continue
+                if provider_type and _norm(key) != _norm(provider_type):
+                    continue
+
+                row = FailedUrl(
+                    url,
+                    record.get('Reason') or 'Unknown error',
+                    int(record.get('Attempts') or ATTEMPTS_PER_ROUND),
+                    record.get('Failed At') or '',
+                    record.get('State') or state,
+                    city,
+                    key,
+                )
+                group = groups.setdefault((_norm(city), _norm(key)), {})
+                # The same URL may be both failed and queued: keep the one with more attempts
+                if url not in group or group[url][0].attempts < row.attempts:
+                    group[url] = (row, entry['kind'])
+    return groups
+
+
+# ---------------------- Retry Pipeline -----------------------
+def retry_failures(state, city_name=None, provider_type=None, session=None, use_cloudscraper=True,
+                   max_attempts=MAX_ATTEMPTS, include_retry_queue=True):
+    """
+    Retry the failed URLs of a state (optionally one city and/or provider type)
+    Only URLs whose backoff has elapsed are fetched; results are merged into the existing
+    data CSVs without duplicating rows. URLs past max_attempts go to *_dead.csv, the rest
+    are written back to the failed / retry files. Pages that load but don't parse leave the
+    failed files for the *_needs_selector.csv bucket (see scrape_url).
+    """
+    groups = load_failures(state, city_name, provider_type, include_retry_queue)
+    if not groups:
+        print("No failed URLs to retry.")
+        return {'retried': 0, 'succeeded': 0, 'failed': 0, 'dead': 0, 'waiting': 0, 'needs_selector': 0}
+
+    if session is None:
+        session = get_shared_session(use_cloudscraper=use_cloudscraper)
+    establish_session(session, use_cloudscraper=use_cloudscraper)
+
+    totals = {'retried': 0, 'succeeded': 0, 'failed': 0, 'dead': 0, 'waiting': 0, 'needs_selector': 0}
+    now = time.time()
+    for failures in groups.values():
+        rows = [row for row, _ in failures.values()]
+        row_state, city, key = rows[0].state, rows[0].city, rows[0].provider_type
+
+        dead = [row for row in rows if row.attempts >= max_attempts]
+        waiting = [(row, failures[row.url][1]) for row in rows if row.attempts < max_attempts and not is_due(row, now)]
+        due = [row for row in rows if row.attempts < max_attempts and is_due(row, now)]
+
+        print(f"\n{city}, {row_state} ({key}): {len(due)} due, {len(waiting)} backing off, {len(dead)} out of attempts")
+
+        result = {'succeeded': 0, 'failed': [], 'retry': [], 'needs_selector': []}
+        if due:
+            result = scrape_url(
+                [row.url for row in due], session, key, row_state, city,
+                use_cloudscraper=use_cloudscraper,
+                prior_attempts={row.url: row.attempts for row in due},
+                write_failures=False,
+                skip_existing=True,
+                full_run=False,
+            )
+
+        dead += [row for row in result['failed'] if row.attempts >= max_attempts]
+        still_failed = [row for row in result['failed'] if row.attempts < max_attempts]
+        still_failed += [row for row, kind in waiting if kind == 'failed']
+        queued = result['retry'] + [row for row, kind in waiting if kind == 'retry']
+
+        save_url_list(still_failed, row_state, city, key, 'failed')
+        if include_retry_queue:
+            save_url_list(queued, row_state, city, key, 'retry')
+        elif queued:
+            # The retry queue wasn't loaded, so add to it instead of replacing it
+            append_url_rows(queued, row_state, city, key, 'retry')
+        if dead:
+            dead_filepath = append_url_rows(dead, row_state, city, key, 'dead')
+            print(f"{len(dead)} URLs moved to dead-letter file: {dead_filepath}")
+
+        totals['retried'] += len(due)
+        totals['succeeded'] += result['succeeded']
+        totals['failed'] += len(still_failed) + len(queued)
+        totals['dead'] += len(dead)
+        totals['waiting'] += len(waiting)
+        totals['needs_selector'] += len(result['needs_selector'])
+
+    print(f"\nRetry summary: {totals}")
+    return totals
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    # Same as `python -m cli retry`: retries every failed URL in a state (default WA)
+    import sys
+    from cli import main
+
+    main(['retry'] + sys.argv[1:])
@@ -0,0 +1,208 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from file_cache import file_key
+from manifest import list_state_folders, load_manifest
+
+
+# ---------------------- Configuration -----------------------
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+# Grid bucket size in degrees (~7 miles of latitude): points are kept sorted by bucket, so a
+# query only touches the contiguous slices of buckets overlapping its bounding box
+CELL_DEG = 0.1
+LON_CELLS = int(round(360 / CELL_DEG))
+
+RESULT_COLUMNS = ['Username', 'Phone Number', 'Address', 'Provider Type', 'City', 'State']
+
+
+# ---------------------- Geometry -----------------------
+def haversine_miles(lat, lon, lats, lons):
+    """Great-circle distance in miles from one point to arrays of points"""
+    lat1 = math.radians(lat)
+    lats2 = np.radians(lats)
+    dlat = lats2 - lat1
+    dlon = np.radians(lons) - math.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lats2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def cell_ids(lats, lons):
+    """Grid bucket of each point"""
+    lat_idx = np.floor((np.asarray(lats) + 90) / CELL_DEG).astype(np.int64)
+    lon_idx = np.floor((np.asarray(lons) + 180) / CELL_DEG).astype(np.int64)
+    return lat_idx * LON_CELLS + np.clip(lon_idx, 0, LON_CELLS - 1)
+
+
+def radius_bbox(lat, lon, miles):
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a radius around a point"""
+    dlat = miles / MILES_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(miles / (MILES_PER_DEGREE_LAT * cos_lat), 180.0)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def _provider_mask(rows, provider_type):
+    return (rows['Provider Type'].str.replace(" ", "_").str.lower()
+            == provider_type.replace(" ", "_").lower()).to_numpy()
+
+
+# ---------------------- Per-file Points -----------------------
+def load_points(filepath):
+    """Listings of a data CSV with valid coordinates: (lats, lons, rows DataFrame)"""
+    df = pd.read_csv(filepath, dtype=str, keep_default_na=False)
+    lats = pd.to_numeric(df.get('Latitude'), errors='coerce').to_numpy(dtype=np.float64)
+    lons = pd.to_numeric(df.get('Longitude'), errors='coerce').to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        valid = (np.abs(lats) <= 90) & (np.abs(lons) <= 180) & ~((lats == 0) & (lons == 0))
+    rows = df.loc[valid, [c for c in RESULT_COLUMNS if c in df.columns]].reset_index(drop=True)
+    return lats[valid], lons[valid], rows
+
+
+class SpatialIndex:
+    """
+    Grid-bucket index over the coordinates of every scraped data file
+    Points are sorted by bucket id; a query turns its bounding box into one id range per
+    latitude row, finds each range with a binary search, and filters the candidates with a
+    vectorized haversine. refresh() only re-reads files that are new or changed since the
+    last call (by mtime and size).
+    """
+
+    def __init__(self, root='.'):
+        self.root = root
+        self.files = {}
+        self.lock = threading.Lock()
+        self.cells = np.empty(0, dtype=np.int64)
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.rows = pd.DataFrame(columns=RESULT_COLUMNS)
+
+    def refresh(self):
+        """Pick up new, changed and deleted data files; returns the number of files (re)read"""
+        current = {}
+        for state in list_state_folders(self.root):
+            folder = os.path.join(self.root, state)
+            for filename, entry in load_manifest(folder).items():
+                if entry['kind'] == 'data' and entry['rows'] > 0:
+                    path = os.path.join(folder, filename)
+                    current[path] = file_key(path)
+
+        with self.lock:
+            changed = [path for path, key in current.items()
+                       if path not in self.files or self.files[path][0] != key]
+            if not changed and current.keys() == self.files.keys():
+                return 0
+            for path in changed:
+                lats, lons, rows = load_points(path)
+                # Pre-sorted per file, so the merge below is a cheap merge of sorted runs
+                cells = cell_ids(lats, lons)
+                order = np.argsort(cells, kind='stable')
+                self.files[path] = (current[path], cells[order], lats[order], lons[order],
+                                    rows.iloc[order].reset_index(drop=True))
+            for path in set(self.files) - set(current):
+                del self.files[path]
+            self._rebuild()
+        return len(changed)
+
+    def _rebuild(self):
+        parts = [self.files[path] for path in sorted(self.files)]
+        if not parts:
+            self.cells = np.empty(0, dtype=np.int64)
+            self.lats = self.lons = np.empty(0)
+            self.rows = pd.DataFrame(columns=RESULT_COLUMNS)
+            return
+        cells = np.concatenate([p[1] for p in parts])
+        order = np.argsort(cells, kind='stable')
+        self.cells = cells[order]
+        self.lats = np.concatenate([p[2] for p in parts])[order]
+        self.lons = np.concatenate([p[3] for p in parts])[order]
+        self.rows = pd.concat([p[4] for p in parts], ignore_index=True).iloc[order].reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def _candidates(self, min_lat, min_lon, max_lat, max_lon):
+        """Positions of the points in the buckets overlapping a bounding box"""
+        min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+        min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+        lat_rows = np.arange(
+            int(math.floor((min_lat + 90) / CELL_DEG)), int(math.floor((max_lat + 90) / CELL_DEG)) + 1,
+            dtype=np.int64
+        )
+        lon_lo = int(math.floor((min_lon + 180) / CELL_DEG))
+        lon_hi = min(int(math.floor((max_lon + 180) / CELL_DEG)), LON_CELLS - 1)
+        starts = np.searchsorted(self.cells, lat_rows * LON_CELLS + lon_lo, side='left')
+        ends = np.searchsorted(self.cells, lat_rows * LON_CELLS + lon_hi, side='right')
+        spans = [np.arange(start, end) for start, end in zip(starts, ends) if end > start]
+        return np.concatenate(spans) if spans else np.empty(0, dtype=np.int64)
+
+    def _result(self, positions, provider_type):
+        rows = self.rows.iloc[positions].copy()
+        rows['Latitude'] = self.lats[positions]
+        rows['Longitude'] = self.lons[positions]
+        if provider_type:
+            rows = rows[_provider_mask(rows, provider_type)]
+        return rows
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon, provider_type=None):
+        """Listings inside a bounding box, optionally of one provider type"""
+        with self.lock:
+            positions = self._candidates(min_lat, min_lon, max_lat, max_lon)
+            lats, lons = self.lats[positions], self.lons[positions]
+            inside = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+            return self._result(positions[inside], provider_type).reset_index(drop=True)
+
+    def radius(self, lat, lon, miles, provider_type=None, limit=None):
+        """Listings within miles of a point, nearest first, with a 'Distance (mi)' column"""
+        with self.lock:
+            positions = self._candidates(*radius_bbox(lat, lon, miles))
+            distances = haversine_miles(lat, lon, self.lats[positions], self.lons[positions])
+            within = distances <= miles
+            positions, distances = positions[within], distances[within]
+            order = np.argsort(distances, kind='stable')
+            rows = self._result(positions[order], None)
+            rows['Distance (mi)'] = distances[order].round(2)
+        if provider_type:
+            rows = rows[_provider_mask(rows, provider_type)]
+        if limit:
+            rows = rows.head(limit)
+        return rows.reset_index(drop=True)
+
+
+_index = None
+
+
+def get_spatial_index():
+    """Process-wide index, built on first use; call refresh() to pick up new files"""
+    global _index
+    if _index is None:
+        _index = SpatialIndex()
+        _index.refresh()
+    return _index
+
+
+# ---------------------- Script Entry -----------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find scraped listings near a point")
+    parser.add_argument('lat', type=float)
+    parser.add_argument('lon', type=float)
+    parser.add_argument('--miles', type=float, default=10)
+    parser.add_argument('--provider', default=None, help="Provider type, e.g. dental_care")
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = get_spatial_index()
+    built = time.perf_counter()
+    results = index.radius(args.lat, args.lon, args.miles, args.provider, args.limit)
+    print(results.to_string(index=False))
+    print(f"\n{len(index)} points indexed in {built - start:.2f}s, query took "
+          f"{(time.perf_counter() - built) * 1000:.1f} ms")
@@ -0,0 +1,20 @@
+from exports import select_files
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+
+
+def test_provider_bundle_includes_search_term_named_files(tmp_path):
+    folder = tmp_path / 'WA'
+    folder.mkdir()
+    write(folder / 'wa_aberdeen_medical_vision_care_urls.csv', "Url\nhttps://www.yellowpages.com/mip/a\n")
+    write(folder / 'wa_aberdeen_medical_vision_care_failed.csv', "Url,Reason\nhttps://www.yellowpages.com/mip/b,HTTP 500\n")
+    write(folder / 'wa_aberdeen_vision-care.csv', "Username\nClear Sight\n")
+    write(folder / 'wa_aberdeen_dental_care_urls.csv', "Url\nhttps://www.yellowpages.com/mip/c\n")
+
+    expected = ['wa_aberdeen_medical_vision_care_failed.csv', 'wa_aberdeen_medical_vision_care_urls.csv',
+                'wa_aberdeen_vision-care.csv']
+    assert list(select_files(str(folder), 'vision-care')) == expected
+    assert list(select_files(str(folder), 'medical vision care')) == expected
+    assert list(select_files(str(folder), 'dental care')) == ['wa_aberdeen_dental_care_urls.csv']
@@ -0,0 +1,37 @@
+from page_classifier import classify_page, INTERSTITIAL, LISTING, ERROR
+
+# Cloudflare injects this beacon into ordinary pages it serves
+BEACON = (b"<script>(function(){function c(){var b=a.contentDocument||a.contentWindow.document;"
+          b"if(b){var d=b.createElement('script');d.innerHTML=\"window.__CF$cv$params={r:'8f1e2d3c4b5a6978',"
+          b"t:'MTczMDAwMDAwMC4wMDAwMDA='};var a=document.createElement('script');a.nonce='';"
+          b"a.src='/cdn-cgi/challenge-platform/scripts/jsd/main.js';"
+          b"document.getElementsByTagName('head')[0].appendChild(a);\";"
+          b"b.getElementsByTagName('head')[0].appendChild(d)}}})();</script>")
+
+LISTING_PAGE = (b'<!DOCTYPE html><html><head><title>Aberdeen Family Dental - Aberdeen, WA</title></head><body>'
+                b'<div class="sales-info"><h1 class="business-name">Aberdeen Family Dental</h1></div>'
+                b'<div id="default-ctas"><a class="phone dockable" href="tel:3605550100">(360) 555-0100</a>'
+                b'<span class="address">101 E Market St, Aberdeen, WA 98520</span></div>'
+                + BEACON + b'</body></html>')
+
+CHALLENGE_PAGE = (b'<!DOCTYPE html><html lang="en-US"><head><title>Just a moment...</title></head><body>'
+                  b'<div class="main-wrapper"><noscript>Enable JavaScript and cookies to continue</noscript></div>'
+                  b'<script>(function(){window._cf_chl_opt={cvId: \'3\',cZone: "www.yellowpages.com"};'
+                  b'var cpo=document.createElement(\'script\');'
+                  b'cpo.src=\'/cdn-cgi/challenge-platform/h/g/orchestrate/chl_page/v1?ray=8f1e2d3c4b5a6978\';'
+                  b'document.getElementsByTagName(\'head\')[0].appendChild(cpo);}());</script></body></html>')
+
+
+def test_listing_with_cloudflare_beacon_is_a_listing():
+    assert classify_page(LISTING_PAGE, 200) == LISTING
+
+
+def test_challenge_page_is_interstitial():
+    assert classify_page(CHALLENGE_PAGE, 403) == INTERSTITIAL
+    assert classify_page(CHALLENGE_PAGE, 200) == INTERSTITIAL
+
+
+def test_beacon_marks_a_challenge_only_on_challenge_statuses():
+    page = b'<html><head><title>Blocked</title></head><body>' + BEACON + b'</body></html>'
+    assert classify_page(page, 503) == INTERSTITIAL
+    assert classify_page(page, 404) == ERROR
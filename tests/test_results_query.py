@@ -0,0 +1,33 @@
+import csv
+import os
+
+import pytest
+
+from records import DATA_COLUMNS
+from results_query import DUCKDB_AVAILABLE, ResultsQuery
+
+pytestmark = pytest.mark.skipif(not DUCKDB_AVAILABLE, reason="duckdb is not installed")
+
+
+def write_data_file(path, rows):
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(DATA_COLUMNS)
+        writer.writerows(rows)
+
+
+def row(name, city, state='ID'):
+    return [name, '', '(208) 555-0100', '', '1 Main St', '47.6', '-116.7', 'dental_care', name, state, city]
+
+
+def test_view_over_file_with_apostrophe(tmp_path):
+    os.mkdir(tmp_path / 'ID')
+    write_data_file(tmp_path / 'ID' / "id_coeur_d'alene_dental_care.csv", [row("Lake Dental", "Coeur d'Alene")])
+    write_data_file(tmp_path / 'ID' / 'id_boise_dental_care.csv', [row("Boise Dental", "Boise")])
+
+    # Both quote kinds: Python's repr of this path isn't a valid DuckDB string either way
+    write_data_file(tmp_path / 'ID' / 'id_o\'brien_"north"_dental_care.csv', [row("North Dental", "O'Brien")])
+
+    query = ResultsQuery(str(tmp_path))
+    assert query.count() == 3
+    assert query.count(city="Coeur d'Alene") == 1
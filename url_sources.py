@@ -0,0 +1,97 @@
+import csv
+import glob
+import hashlib
+import sys
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+# ---------------------- Configuration -----------------------
+# Query parameters that only track the click and don't identify the page
+TRACKING_PARAMS = ('lid', 'from', 'fsid', 'ypid')
+
+
+# ---------------------- Canonical URLs -----------------------
+def canonical_url(url):
+    """
+    Normalized form of a URL used for hashing and de-duplication:
+    lowercase scheme/host, no fragment, no trailing slash, no tracking or utm_* params,
+    remaining query params sorted
+    """
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+
+def url_hash(url):
+    """Stable 64-bit hash of the canonical URL (same value on every machine and run)"""
+    digest = hashlib.blake2b(canonical_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+# ---------------------- Sharding -----------------------
+def parse_shard(spec):
+    """Parse 'i/n' (0 <= i < n) into (i, n)"""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected i/n, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}': need 0 <= i < n")
+    return index, count
+
+
+def shard_urls(urls, index, count):
+    """
+    Keep only the URLs hashed to shard index of count
+    Independent processes given 0/n .. n-1/n each get a disjoint slice without coordination
+    """
+    if count == 1:
+        yield from urls
+        return
+    for url in urls:
+        if url_hash(url) % count == index:
+            yield url
+
+
+# ---------------------- Sources -----------------------
+def iter_csv_urls(filepath):
+    """Lazily yield URLs from a CSV with a 'Url' column (or the first column)"""
+    with open(filepath, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            url = row['Url'] if 'Url' in row else next(iter(row.values()), None)
+            if url:
+                yield url.strip()
+
+
+def iter_text_urls(file):
+    """Lazily yield URLs from a newline-separated file object, skipping blanks and # comments"""
+    for line in file:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def iter_url_sources(sources):
+    """
+    Chain several URL sources lazily
+    Each source is '-' (stdin), a path, or a glob pattern; *.csv files are read as CSV,
+    anything else as one URL per line
+    """
+    for source in sources:
+        if source == '-':
+            yield from iter_text_urls(sys.stdin)
+            continue
+        paths = sorted(glob.glob(source)) if glob.has_magic(source) else [source]
+        if not paths:
+            print(f"✗ No files match: {source}")
+        for path in paths:
+            if path.endswith('.csv'):
+                yield from iter_csv_urls(path)
+            else:
+                with open(path, mode='r', encoding='utf-8') as file:
+                    yield from iter_text_urls(file)